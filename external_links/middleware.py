@@ -1,62 +1,40 @@
-from html.parser import HTMLParser
-import re
-
 from django.conf import settings
-from django.template.defaultfilters import urlencode
 from django.urls import reverse
 
-
-SAFE_EXTERNAL_LINK_PATTERNS = getattr(settings, 'SAFE_EXTERNAL_LINK_PATTERNS', ())
-safe_urls = ''
-if SAFE_EXTERNAL_LINK_PATTERNS:
-    safe_urls = '(?!(' + '|'.join(SAFE_EXTERNAL_LINK_PATTERNS) + '))'
+from external_links.utils import StreamingExternalLinkRewriter, split_into_chunks
 
 
 class RewriteExternalLinksMiddleware:
     """
-    Rewrite all external links to go via a message page.
-    Rewrite:
-        <a href="http://www.example.com">
-    To:
-        <a href="/external-link/?next=http://www.example.com">
+    Rewrite the external links left in HTML responses to go via a message page.
+    Rich text, Markdown and templates rewrite their external links when they are
+    rendered, this is the fallback for any other HTML. It is enabled with
+    REWRITE_EXTERNAL_LINKS_IN_RESPONSES = True.
+
+    Responses are rewritten chunk by chunk, streaming responses included.
     """
     def __init__(self, get_response):
         self.get_response = get_response
-        self.extlinks = re.compile(r'''
-            (?P<before><a[^>]*href=['"]?)  # content from `<a` to `href='`
-            (?P<link>https?://{}[^'">]*)  # href link
-            (?P<after>[^>]*)  # content after href to closing bracket `>`
-        '''.format(safe_urls), re.VERBOSE)
 
     def __call__(self, request):
         response = self.get_response(request)
-        external_link_root = reverse('external-link')
 
-        # neither external_link_root nor request.path include hostname
-        if response.streaming:
+        if not getattr(settings, 'REWRITE_EXTERNAL_LINKS_IN_RESPONSES', False):
             return response
 
-        h = HTMLParser()
         html_content_type = 'text/html' in response.get('content-type', '')
-        start_link = request.path.startswith(external_link_root)
-
-        if (response.content and html_content_type and not start_link):
-            next = request.path
-
-            def linkrepl(m):
-                return '{before}{root}?next={link}&from={next}{after}'.format(
-                    root=external_link_root,
-                    next=next,
-                    before=m.group('before'),
-                    # unescape the link before encoding it to ensure entities
-                    # such as '&' don't get double escaped
-                    link=urlencode(h.unescape(m.group('link')), safe=''),
-                    after=m.group('after'),
-                )
-            response.content = self.extlinks.sub(
-                linkrepl,
-                response.content.decode('utf-8')
-            )
+        # neither external_link_root nor request.path include hostname
+        start_link = request.path.startswith(reverse('external-link'))
+        if not html_content_type or start_link:
+            return response
+
+        rewriter = StreamingExternalLinkRewriter(from_path=request.path, encoding=response.charset)
+        if response.streaming:
+            response.streaming_content = rewriter.rewrite(response.streaming_content)
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        elif b'://' in response.content:
+            response.content = b''.join(rewriter.rewrite(split_into_chunks(response.content)))
             response['Content-Length'] = len(response.content)
 
         return response
@@ -0,0 +1,98 @@
+import codecs
+import re
+from html import unescape
+
+from django.conf import settings
+from django.template.defaultfilters import urlencode
+from django.urls import reverse
+
+SAFE_EXTERNAL_LINK_PATTERNS = getattr(settings, 'SAFE_EXTERNAL_LINK_PATTERNS', ())
+safe_urls = ''
+if SAFE_EXTERNAL_LINK_PATTERNS:
+    safe_urls = '(?!(' + '|'.join(SAFE_EXTERNAL_LINK_PATTERNS) + '))'
+
+EXTERNAL_URL = re.compile(r'https?://{}'.format(safe_urls))
+EXTERNAL_LINK = re.compile(r'''
+    (?P<before><a[^>]*href=['"]?)  # content from `<a` to `href='`
+    (?P<link>https?://{}[^'">]*)  # href link
+    (?P<after>[^>]*)  # content after href to closing bracket `>`
+'''.format(safe_urls), re.VERBOSE)
+
+# Size of the chunks non streaming responses are rewritten in
+CHUNK_SIZE = 64 * 1024
+
+
+def is_external_link(url):
+    return bool(url and EXTERNAL_URL.match(url))
+
+
+def get_external_link_url(url, from_path=None):
+    """
+    :return: the url of the message page leading to the external url
+    """
+    # unescape the link before encoding it to ensure entities
+    # such as '&' don't get double escaped
+    external_link_url = '{root}?next={link}'.format(
+        root=reverse('external-link'), link=urlencode(unescape(url), safe=''))
+    if from_path:
+        external_link_url += f'&from={from_path}'
+    return external_link_url
+
+
+def rewrite_external_links(html, from_path=None):
+    """
+    Rewrite all external links of the HTML to go via a message page.
+    Rewrite:
+        <a href="http://www.example.com">
+    To:
+        <a href="/external-link/?next=http%3A%2F%2Fwww.example.com">
+    """
+    def linkrepl(m):
+        return '{before}{link}{after}'.format(
+            before=m.group('before'),
+            link=get_external_link_url(m.group('link'), from_path),
+            after=m.group('after'),
+        )
+
+    return EXTERNAL_LINK.sub(linkrepl, html)
+
+
+class StreamingExternalLinkRewriter:
+    """
+    Rewrite the external links of HTML split into byte chunks, e.g. the content of a
+    streaming response, without holding the whole document in memory. A tag split
+    between two chunks is rewritten with the next chunk.
+    """
+
+    def __init__(self, from_path=None, encoding='utf-8'):
+        self.from_path = from_path
+        self.encoding = encoding
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.pending = ''
+
+    def feed(self, chunk):
+        html = self.pending + self.decoder.decode(chunk)
+        tag_start = html.rfind('<')
+        if tag_start != -1 and html.find('>', tag_start) == -1:
+            html, self.pending = html[:tag_start], html[tag_start:]
+        else:
+            self.pending = ''
+        return rewrite_external_links(html, self.from_path).encode(self.encoding)
+
+    def close(self):
+        html = self.pending + self.decoder.decode(b'', final=True)
+        self.pending = ''
+        return rewrite_external_links(html, self.from_path).encode(self.encoding)
+
+    def rewrite(self, chunks):
+        for chunk in chunks:
+            rewritten = self.feed(chunk)
+            if rewritten:
+                yield rewritten
+        rewritten = self.close()
+        if rewritten:
+            yield rewritten
+
+
+def split_into_chunks(content, chunk_size=CHUNK_SIZE):
+    return (content[start:start + chunk_size] for start in range(0, len(content), chunk_size))
@@ -1,13 +1,44 @@
+import hashlib
+
+from django.core.cache import cache
 from django.forms.utils import flatatt
 from django.template.loader import render_to_string
+from django.utils import translation
 from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
 from django.utils.translation import gettext as _
 
 from wagtail.core import blocks
 from wagtail.core.blocks import PageChooserBlock
 from wagtail.images.blocks import ImageChooserBlock
+from wagtailmarkdown import blocks as markdown_blocks
 from wagtailmedia.blocks import AbstractMediaChooserBlock
 
+from external_links.utils import rewrite_external_links
+from questionnaires import submitted
+
+MARKDOWN_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class MarkdownBlock(markdown_blocks.MarkdownBlock):
+    def render_basic(self, value, context=None):
+        """
+        The rendered HTML, with its external links rewritten to come back to the current
+        path, is cached per Markdown source, locale and path.
+        """
+        request = (context or {}).get('request')
+        from_path = request.path if request else None
+        cache_key = 'markdown:{}:{}:{}'.format(
+            translation.get_language(),
+            hashlib.md5(value.encode('utf-8')).hexdigest(),
+            hashlib.md5(str(from_path).encode('utf-8')).hexdigest(),
+        )
+        html = cache.get(cache_key)
+        if html is None:
+            html = rewrite_external_links(str(super().render_basic(value, context)), from_path)
+            cache.set(cache_key, html, MARKDOWN_CACHE_TIMEOUT)
+        return mark_safe(html)
+
 
 class MediaBlock(AbstractMediaChooserBlock):
     def render_basic(self, value, context=None):
@@ -77,10 +108,17 @@ class SocialMediaShareButtonBlock(blocks.StructBlock):
 class EmbeddedQuestionnaireChooserBlock(blocks.PageChooserBlock):
 
     def render_basic(self, value, context=None):
+        request = context.get('request')
+        # Submitted questionnaires are shown without their form, like on their page
+        already_submitted = (
+            request is not None
+            and not value.allow_multiple_submissions
+            and submitted.has_submitted(request, value)
+        )
         context.update({
             'object': value,
             'type': value.__class__.__name__,
-            'form': value.get_form(),
+            'form': None if already_submitted else value.get_form(),
         })
         return render_to_string('blocks/embedded_questionnaire.html', context)
 
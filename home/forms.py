@@ -8,8 +8,15 @@ class SectionPageForm(WagtailAdminPageForm):
 
         if cleaned_data['show_progress_bar']:
             Section = apps.get_model('home', 'Section')
-            if self.instance not in Section.get_progress_bar_eligible_sections():
-                progress_bar_enabled_ancestor_title = self.instance.get_progress_bar_enabled_ancestor().title
+            if self.instance.pk:
+                progress_bar_enabled_ancestor = Section.get_progress_bar_enabled_section_above(self.instance)
+            else:
+                # A new section isn't in the tree yet, check its parent and the parent's ancestors
+                progress_bar_enabled_ancestor = Section.get_progress_bar_enabled_section_above(
+                    self.parent_page, inclusive=True)
+
+            if progress_bar_enabled_ancestor:
+                progress_bar_enabled_ancestor_title = progress_bar_enabled_ancestor.title
                 self.add_error(
                     'show_progress_bar',
                     f'This section is not eligible for showing the progress bar. '
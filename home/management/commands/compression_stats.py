@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from home.utils import compression
+
+
+class Command(BaseCommand):
+    """
+    This command reports the bytes saved by response compression per URL pattern
+    since the statistics were last reset.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the statistics after reporting them')
+
+    def handle(self, *args, **options):
+        stats = compression.get_stats()
+        for pattern, counters in stats.items():
+            ratio = counters['compressed_bytes'] / counters['original_bytes'] if counters['original_bytes'] else 1
+            self.stdout.write(
+                f"{pattern}: {counters['responses']} responses, {counters['saved_bytes']} bytes saved "
+                f"({counters['original_bytes']} -> {counters['compressed_bytes']}, {ratio:.0%}), "
+                f"{counters['cached_variants']} served pre-compressed")
+
+        if options['reset']:
+            compression.reset_stats()
+        self.stdout.write(self.style.SUCCESS(f'Successfully reported the compression of {len(stats)} URL patterns'))
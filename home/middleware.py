@@ -0,0 +1,81 @@
+from django.utils.cache import patch_vary_headers
+
+from .utils import compression
+
+MIN_LENGTH = 200
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli or gzip, whichever the client prefers. It has to
+    come before any middleware reading or changing the response content, e.g.
+    RewriteExternalLinksMiddleware, so that it compresses their final output.
+
+    The compressed variants of the pages served from the page cache are cached too.
+    `manage.py compression_stats` reports the bytes saved per URL pattern.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.streaming and len(response.content) < MIN_LENGTH:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = compression.negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if not encoding:
+            return response
+
+        pattern = self.get_url_pattern(request)
+        if response.streaming:
+            response.streaming_content = self.compress_streaming(response.streaming_content, encoding, pattern)
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        else:
+            # Pages served to anonymous users without a CSRF token are the same for
+            # every request until they expire from the page cache.
+            store = bool(getattr(request, 'page_cache_key', None)) and not request.META.get('CSRF_COOKIE_USED')
+            content = response.content
+            compressed, cached_variant = compression.get_or_compress(content, encoding, store=store)
+            if len(compressed) >= len(content):
+                return response
+
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+            compression.record_stats(pattern, len(content), len(compressed), cached_variant)
+
+        # If there is a strong ETag, make it weak to fulfill the requirements of
+        # RFC 7232 section-2.1 while also allowing conditional request matches on ETags.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+
+        return response
+
+    @staticmethod
+    def get_url_pattern(request):
+        resolver_match = getattr(request, 'resolver_match', None)
+        if not resolver_match:
+            return 'unresolved'
+        return resolver_match.view_name or resolver_match.route
+
+    @staticmethod
+    def compress_streaming(streaming_content, encoding, pattern):
+        sizes = {'original': 0, 'compressed': 0}
+
+        def count_original():
+            for chunk in streaming_content:
+                sizes['original'] += len(chunk)
+                yield chunk
+
+        for chunk in compression.compress_streaming(count_original(), encoding):
+            sizes['compressed'] += len(chunk)
+            yield chunk
+
+        compression.record_stats(pattern, sizes['original'], sizes['compressed'], False)
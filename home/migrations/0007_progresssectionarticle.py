@@ -0,0 +1,46 @@
+# Generated by Django 3.1.14 on 2026-10-18 04:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_progress_index(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Article = apps.get_model('home', 'Article')
+    Section = apps.get_model('home', 'Section')
+    ProgressSectionArticle = apps.get_model('home', 'ProgressSectionArticle')
+
+    article_content_type = ContentType.objects.filter(app_label='home', model='article').first()
+    if not article_content_type:
+        return
+
+    for section in Section.objects.filter(show_progress_bar=True, live=True):
+        article_ids = Article.objects.filter(
+            path__startswith=section.path, depth__gt=section.depth, live=True,
+            content_type=article_content_type).values_list('pk', flat=True)
+        ProgressSectionArticle.objects.bulk_create([
+            ProgressSectionArticle(section_id=section.pk, article_id=article_id) for article_id in article_ids
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('home', '0006_auto_20210719_1820'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressSectionArticle',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_sections', to='home.article')),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_articles', to='home.section')),
+            ],
+            options={
+                'unique_together': {('section', 'article')},
+            },
+        ),
+        migrations.RunPython(build_progress_index, migrations.RunPython.noop),
+    ]
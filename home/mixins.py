@@ -1,4 +1,13 @@
+import csv
+import tempfile
+
+from django.http import FileResponse
+from django.template.response import TemplateResponse
 from django.utils.functional import cached_property
+from wagtail.admin.views.mixins import Echo
+from xlsxwriter.workbook import Workbook
+
+from .utils import page_cache, site_settings
 
 
 class PageUtilsMixin:
@@ -11,3 +20,112 @@ class PageUtilsMixin:
     def parent_section(self):
         from .models import Section
         return Section.objects.parent_of(self).type(Section).first()
+
+
+class AnonymousPageCacheMixin:
+    """
+    This mixin serves the rendered page to anonymous users from the cache. It has to
+    come before wagtail.core.models.Page in the bases of the page model.
+    """
+
+    def get_page_cache_variant(self, request):
+        """
+        Everything in the rendered page that depends on the session of the anonymous user
+        """
+        return request.session.get('first_time_user', True)
+
+    def get_context(self, request, *args, **kwargs):
+        context = super().get_context(request, *args, **kwargs)
+        if getattr(request, 'page_cache_key', None):
+            context['csrf_token'] = page_cache.CSRF_TOKEN_PLACEHOLDER
+        return context
+
+    def serve(self, request, *args, **kwargs):
+        if not page_cache.is_cacheable_request(request):
+            return super().serve(request, *args, **kwargs)
+
+        cache_key = page_cache.get_cache_key(request, self, self.get_page_cache_variant(request))
+        request.page_cache_key = cache_key
+        response = page_cache.get_cached_response(request, cache_key)
+        if response is not None:
+            return response
+
+        response = super().serve(request, *args, **kwargs)
+        if isinstance(response, TemplateResponse):
+            response.add_post_render_callback(
+                lambda rendered_response: page_cache.cache_response(request, cache_key, rendered_response))
+        return response
+
+
+class CachedSettingMixin:
+    """
+    This mixin serves the settings of wagtail.contrib.settings from a per process
+    snapshot, see home.utils.site_settings. The instances are copies shared by
+    every request of the process, for_site still reads from the database for
+    editing.
+    """
+
+    @classmethod
+    def for_request(cls, request):
+        attr_name = cls.get_cache_attr_name()
+        if not hasattr(request, attr_name):
+            setting = site_settings.get_setting(cls, site_settings.find_site_for_request(request))
+            # to allow more efficient page url generation
+            setting._request = request
+            setattr(request, attr_name, setting)
+        return getattr(request, attr_name)
+
+    @classmethod
+    def get_for_default_site(cls):
+        return site_settings.get_setting(cls, site_settings.get_default_site())
+
+
+class ChunkedExportMixin:
+    """
+    This mixin makes the spreadsheet exports of wagtail.admin.views.mixins.SpreadsheetExportMixin
+    read the queryset in chunks, with server side cursors where the database supports
+    them, so that the memory used doesn't depend on the number of rows. CSV rows are
+    streamed as they are written. XLSX files are zip archives which can only be sent
+    once complete, they are written in constant memory mode to a temporary file.
+    """
+    export_chunk_size = 2000
+
+    def iter_row_dicts(self, queryset):
+        for item in queryset.iterator(chunk_size=self.export_chunk_size):
+            yield self.to_row_dict(item)
+
+    def stream_csv(self, queryset):
+        writer = csv.DictWriter(Echo(), fieldnames=self.list_export)
+        yield writer.writerow(
+            {field: self.get_heading(queryset, field) for field in self.list_export}
+        )
+
+        for row_dict in self.iter_row_dicts(queryset):
+            yield self.write_csv_row(writer, row_dict)
+
+    def write_xlsx(self, queryset, output):
+        workbook = Workbook(
+            output,
+            {
+                'constant_memory': True,
+                'remove_timezone': True,
+                'default_date_format': 'dd/mm/yy hh:mm:ss',
+            },
+        )
+        worksheet = workbook.add_worksheet()
+
+        for col_number, field in enumerate(self.list_export):
+            worksheet.write(0, col_number, self.get_heading(queryset, field))
+
+        for row_number, row_dict in enumerate(self.iter_row_dicts(queryset)):
+            self.write_xlsx_row(worksheet, row_dict, row_number + 1)
+
+        workbook.close()
+
+    def write_xlsx_response(self, queryset):
+        output = tempfile.TemporaryFile()
+        self.write_xlsx(queryset, output)
+        output.seek(0)
+        return FileResponse(
+            output, as_attachment=True, filename=f'{self.get_filename()}.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
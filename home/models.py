@@ -1,11 +1,14 @@
 import os
 
 from django.conf import settings
-from django.contrib.admin.utils import flatten
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.core.files.images import get_image_dimensions
 from django.db import models
+from django.db.models import Exists, F, OuterRef, prefetch_related_objects
+from django.db.models.functions import Substr
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.deconstruct import deconstructible
 from django.utils.encoding import force_str
 from django.utils.translation import gettext_lazy as _
@@ -29,11 +32,11 @@ from wagtail.core import blocks
 from wagtail.core.fields import StreamField, RichTextField
 from wagtail.core.models import Orderable, Page, Site, Locale
 from wagtail.core.rich_text import get_text_for_indexing
+from wagtail.core.signals import page_published, page_unpublished, post_page_move
 from wagtail.images.blocks import ImageChooserBlock
 from wagtail.images.edit_handlers import ImageChooserPanel
 from wagtail.images.models import Image
 from wagtail.search import index
-from wagtailmarkdown.blocks import MarkdownBlock
 from wagtailmenus.models import AbstractFlatMenuItem, BooleanField
 from wagtailsvg.models import Svg
 from wagtailsvg.edit_handlers import SvgChooserPanel
@@ -42,19 +45,22 @@ from wagtailsvg.edit_handlers import SvgChooserPanel
 from messaging.blocks import ChatBotButtonBlock
 from comments.models import CommentableMixin
 from iogt.views import check_user_session
+from iogt_users import registration_survey
 from questionnaires.models import Survey, Poll, Quiz
 from .blocks import (MediaBlock, SocialMediaLinkBlock,
                      SocialMediaShareButtonBlock,
                      EmbeddedQuestionnaireChooserBlock,
-                     PageButtonBlock, ArticleChooserBlock)
+                     PageButtonBlock, ArticleChooserBlock, MarkdownBlock)
 from .forms import SectionPageForm
-from .mixins import PageUtilsMixin
+from .mixins import AnonymousPageCacheMixin, CachedSettingMixin, PageUtilsMixin
+from .utils import page_cache, site_settings
+from .utils.cache_versions import bump_versions
 from .utils.progress_manager import ProgressManager
 
 User = get_user_model()
 
 
-class HomePage(Page):
+class HomePage(AnonymousPageCacheMixin, Page):
     template = 'home/home_page.html'
     show_in_menus_default = True
 
@@ -128,11 +134,11 @@ class SectionIndexPage(Page):
     def get_top_level_sections(cls):
         section_index_page = cls.objects.filter(locale=Locale.get_active()).first()
         if section_index_page:
-            return section_index_page.get_children().live()
+            return section_index_page.get_children().live().specific()
         return cls.objects.none()
 
 
-class Section(Page, PageUtilsMixin):
+class Section(AnonymousPageCacheMixin, Page, PageUtilsMixin):
     lead_image = models.ForeignKey(
         'wagtailimages.Image',
         on_delete=models.PROTECT,
@@ -188,9 +194,7 @@ class Section(Page, PageUtilsMixin):
         return Article.objects.descendant_of(self).exact_type(Article)
 
     def get_progress_bar_enabled_ancestor(self):
-        return Section.objects.ancestor_of(self, inclusive=True).exact_type(
-            Section).filter(
-            show_progress_bar=True).first()
+        return self.get_progress_bar_enabled_section_above(self, inclusive=True)
 
     def get_user_progress_dict(self, request):
         progress_manager = ProgressManager(request)
@@ -201,6 +205,26 @@ class Section(Page, PageUtilsMixin):
             'total': total_article_count
         }
 
+    def get_children_by_type(self):
+        """
+        Load the live children with a single query per page type and partition them
+        in python, instead of querying the children once per page type.
+        :return: {page type: [specific child pages]}
+        """
+        children = {Section: [], Article: [], Survey: [], Poll: [], Quiz: []}
+        for child in self.get_children().live().specific():
+            for page_type, pages in children.items():
+                if isinstance(child, page_type):
+                    pages.append(child)
+                    break
+
+        prefetch_related_objects(children[Article], 'lead_image')
+        return children
+
+    def get_page_cache_variant(self, request):
+        user_progress = self.get_user_progress_dict(request)
+        return super().get_page_cache_variant(request), user_progress['read'], user_progress['total']
+
     def get_context(self, request):
         check_user_session(request)
         context = super().get_context(request)
@@ -208,11 +232,12 @@ class Section(Page, PageUtilsMixin):
             featured_content.content for featured_content in
             self.featured_content.filter(content__live=True)
         ]
-        context['sub_sections'] = self.get_children().live().type(Section)
-        context['articles'] = self.get_children().live().type(Article)
-        context['surveys'] = self.get_children().live().type(Survey)
-        context['polls'] = self.get_children().live().type(Poll)
-        context['quizzes'] = self.get_children().live().type(Quiz)
+        children = self.get_children_by_type()
+        context['sub_sections'] = children[Section]
+        context['articles'] = children[Article]
+        context['surveys'] = children[Survey]
+        context['polls'] = children[Poll]
+        context['quizzes'] = children[Quiz]
 
         context['user_progress'] = self.get_user_progress_dict(request)
 
@@ -224,23 +249,62 @@ class Section(Page, PageUtilsMixin):
         Eligibility criteria:
         Sections whose ancestors don't have show_progress_bar=True are eligible to
         show progress bars.
+        An ancestor's path is the prefix of the section's path of length depth * steplen,
+        so this is a single query regardless of the size of the tree.
         :return:e
         """
-        progress_bar_sections = Section.objects.filter(show_progress_bar=True)
-        all_descendants = [list(
-            Section.objects.type(Section).descendant_of(section).values_list(
-                'pk', flat=True)) for
-            section in
-            progress_bar_sections]
-        all_descendants = set(flatten(all_descendants))
+        progress_bar_ancestors = Section.objects.filter(
+            show_progress_bar=True, depth__lt=OuterRef('depth'),
+        ).annotate(
+            descendant_path_prefix=Substr(
+                OuterRef('path'), 1, F('depth') * Section.steplen, output_field=models.CharField()),
+        ).filter(path=F('descendant_path_prefix'))
 
-        return Section.objects.exclude(pk__in=all_descendants)
+        return Section.objects.exclude(Exists(progress_bar_ancestors))
+
+    @staticmethod
+    def get_progress_bar_enabled_section_above(page, inclusive=False):
+        """
+        Look up the progress bar section among the O(depth) ancestors of the page.
+        Works for pages that are not saved yet when given their parent and inclusive=True.
+        """
+        return Section.objects.ancestor_of(page, inclusive=inclusive).exact_type(Section).filter(
+            show_progress_bar=True).first()
 
     class Meta:
         verbose_name = _("section")
         verbose_name_plural = _("sections")
 
 
+class ProgressSectionArticle(models.Model):
+    """
+    Index of the live articles under each section that shows a progress bar, so that
+    the progress of a user is a single query instead of a walk of the page tree.
+    """
+    section = models.ForeignKey('Section', on_delete=models.CASCADE, related_name='progress_articles')
+    article = models.ForeignKey('Article', on_delete=models.CASCADE, related_name='progress_sections')
+
+    class Meta:
+        unique_together = ('section', 'article')
+
+    @classmethod
+    def rebuild(cls, section):
+        cls.objects.filter(section=section).delete()
+        if section.show_progress_bar and section.live:
+            article_ids = Article.objects.descendant_of(section).exact_type(Article).live().values_list(
+                'pk', flat=True)
+            cls.objects.bulk_create([cls(section=section, article_id=article_id) for article_id in article_ids])
+
+    @classmethod
+    def rebuild_for_page(cls, page, inclusive=True):
+        """
+        Rebuild the index of every progress bar section the page belongs to.
+        """
+        for section in Section.objects.ancestor_of(page, inclusive=inclusive).exact_type(Section).filter(
+                show_progress_bar=True):
+            cls.rebuild(section)
+
+
 class ArticleRecommendation(Orderable):
     source = ParentalKey('Article', related_name='recommended_articles',
                          on_delete=models.CASCADE, blank=True)
@@ -251,7 +315,7 @@ class ArticleRecommendation(Orderable):
     ]
 
 
-class Article(Page, PageUtilsMixin, CommentableMixin):
+class Article(AnonymousPageCacheMixin, Page, PageUtilsMixin, CommentableMixin):
     lead_image = models.ForeignKey(
         'wagtailimages.Image',
         on_delete=models.PROTECT,
@@ -340,6 +404,14 @@ class Article(Page, PageUtilsMixin, CommentableMixin):
         return Section.objects.ancestor_of(self).type(Section).filter(
             show_progress_bar=True).first()
 
+    def get_page_cache_variant(self, request):
+        variant = super().get_page_cache_variant(request)
+        progress_enabled_section = self._get_progress_enabled_section()
+        if progress_enabled_section:
+            user_progress = progress_enabled_section.get_user_progress_dict(request)
+            return variant, user_progress['read'], user_progress['total']
+        return variant
+
     def get_context(self, request):
         check_user_session(request)
         context = super().get_context(request)
@@ -446,11 +518,13 @@ class FooterPage(Article):
 
     @classmethod
     def get_active_footers(cls):
-        return cls.objects.filter(locale=Locale.get_active()).live()
+        return cls.objects.filter(locale=Locale.get_active()).live().select_related('icon')
 
 
 @register_setting
-class SiteSettings(BaseSetting):
+class SiteSettings(CachedSettingMixin, BaseSetting):
+    select_related = ['logo']
+
     logo = models.ForeignKey(
         'wagtailimages.Image',
         null=True,
@@ -588,11 +662,6 @@ class SiteSettings(BaseSetting):
         ),
     ]
 
-    @classmethod
-    def get_for_default_site(cls):
-        default_site = Site.objects.filter(is_default_site=True).first()
-        return cls.for_site(default_site)
-
     def __str__(self):
         return self.site.site_name
 
@@ -602,7 +671,7 @@ class SiteSettings(BaseSetting):
 
 
 @register_setting
-class CacheSettings(BaseSetting):
+class CacheSettings(CachedSettingMixin, BaseSetting):
     cache = models.BooleanField(
         default=True,
         verbose_name=_("Prompt users to download?"),
@@ -812,3 +881,89 @@ class ManifestSettings(models.Model):
         )
         verbose_name = "Manifest settings"
         verbose_name_plural = "Manifests settings"
+
+
+def _get_featuring_page_ids(page):
+    return set(FeaturedContent.objects.filter(content_id=page.pk).values_list('source_id', flat=True)) | \
+        set(HomePageBanner.objects.filter(banner_page_id=page.pk).values_list('source_id', flat=True)) | \
+        set(ArticleRecommendation.objects.filter(article_id=page.pk).values_list('source_id', flat=True))
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+def purge_page_cache(sender, instance, **kwargs):
+    is_navigation_page = (
+        isinstance(instance, (FooterPage, SectionIndexPage))
+        or (isinstance(instance, Section) and instance.get_parent().specific_class is SectionIndexPage)
+        or IogtFlatMenuItem.objects.filter(link_page_id=instance.pk).exists()
+    )
+    if is_navigation_page:
+        # The navigation is shown on every page
+        page_cache.purge_all()
+        return
+
+    page_ids = {instance.pk} | _get_featuring_page_ids(instance)
+    page_ids |= set(instance.get_ancestors().values_list('pk', flat=True))
+    page_cache.purge_pages(page_ids)
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+def update_progress_index(sender, instance, **kwargs):
+    if isinstance(instance, Section):
+        # show_progress_bar may have been switched on or off
+        ProgressSectionArticle.rebuild(instance)
+        ProgressSectionArticle.rebuild_for_page(instance, inclusive=False)
+    elif type(instance) is Article:
+        ProgressSectionArticle.rebuild_for_page(instance)
+
+
+@receiver(post_page_move)
+def update_progress_index_on_move(sender, instance, parent_page_before, parent_page_after, **kwargs):
+    ProgressSectionArticle.rebuild_for_page(parent_page_before)
+    ProgressSectionArticle.rebuild_for_page(parent_page_after)
+
+
+@receiver(post_page_move)
+def purge_page_cache_on_move(sender, instance, parent_page_before, parent_page_after, **kwargs):
+    page_ids = set(instance.get_descendants(inclusive=True).values_list('pk', flat=True))
+    page_ids |= set(parent_page_before.get_ancestors(inclusive=True).values_list('pk', flat=True))
+    page_ids |= set(parent_page_after.get_ancestors(inclusive=True).values_list('pk', flat=True))
+    page_cache.purge_pages(page_ids)
+
+
+@receiver(post_save, sender=IogtFlatMenuItem)
+@receiver(post_delete, sender=IogtFlatMenuItem)
+def purge_page_cache_on_menu_change(sender, **kwargs):
+    page_cache.purge_all()
+
+
+@receiver(post_save, sender=SiteSettings)
+@receiver(post_save, sender=CacheSettings)
+def invalidate_on_settings_change(sender, created, **kwargs):
+    # Settings are created with their default values on first access
+    if created:
+        return
+    version_keys = [page_cache.GLOBAL_VERSION_KEY, site_settings.VERSION_KEY]
+    if sender is SiteSettings:
+        version_keys.append(registration_survey.VERSION_KEY)
+    bump_versions(*version_keys)
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+@receiver(post_delete, sender=Survey)
+@receiver(post_delete, sender=Image)
+def invalidate_site_settings_on_site_change(sender, **kwargs):
+    # Deleting the logo or the registration survey clears them from the settings
+    site_settings.invalidate()
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Survey)
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(post_page_move)
+def invalidate_registration_survey(sender, **kwargs):
+    # The survey url changes with the slug and the path of any of its ancestors
+    registration_survey.invalidate()
@@ -1,12 +1,39 @@
 from django import template
 from wagtail.core.models import Locale
 
+from external_links.utils import get_external_link_url, is_external_link
 from home.models import FooterPage, SectionIndexPage
+from home.utils import page_cache
 from iogt.settings.base import LANGUAGES
 
 register = template.Library()
 
 
+class NavigationCacheNode(template.Node):
+    def __init__(self, nodelist, fragment_name):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+
+    def render(self, context):
+        fragment_name = self.fragment_name.resolve(context)
+        return page_cache.get_or_render_fragment(
+            fragment_name, context.get('request'), lambda: self.nodelist.render(context))
+
+
+@register.tag
+def navigation_cache(parser, token):
+    """
+    Cache the enclosed navigation per site and locale until the navigation changes.
+    Usage: {% navigation_cache 'fragment_name' %} ... {% endnavigation_cache %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires exactly one argument.")
+    nodelist = parser.parse(('endnavigation_cache',))
+    parser.delete_first_token()
+    return NavigationCacheNode(nodelist, parser.compile_filter(bits[1]))
+
+
 @register.inclusion_tag('home/tags/footer.html', takes_context=True)
 def footer(context):
     return {
@@ -69,3 +96,11 @@ def locale_set(locale, url):
         code = item[0]
         url = url.replace(f"/{code}/", "")
     return f'/{locale}/{url}'
+
+
+@register.filter
+def external_link(url):
+    """
+    Rewrite an external url to go via the message page, see RewriteExternalLinksMiddleware.
+    """
+    return get_external_link_url(url) if is_external_link(url) else url
@@ -1,5 +1,8 @@
 from bs4 import BeautifulSoup
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase
+from external_links.utils import StreamingExternalLinkRewriter, split_into_chunks
+from home.blocks import MarkdownBlock
 from home.models import Article
 from home.tests.faker import faker
 from rest_framework import status
@@ -90,3 +93,33 @@ class TransitionPageForExtIntLinksInRichTextTests(TestCase):
 
         for link in main_block.find_all("a"):
             assert self.external_link_pattern not in link["href"]
+
+
+class StreamingExternalLinkRewriterTests(TestCase):
+    def test_links_split_between_chunks_are_rewritten(self):
+        html = '<p><a class="link" href="https://example.com/?a=1&amp;b=2">example</a></p>'.encode()
+        rewriter = StreamingExternalLinkRewriter(from_path='/en/article/')
+
+        for chunk_size in range(1, len(html)):
+            rewritten = b''.join(rewriter.rewrite(split_into_chunks(html, chunk_size)))
+
+            self.assertEqual(
+                rewritten.decode(),
+                '<p><a class="link" href="/en/external-link/?next=https%3A%2F%2Fexample.com%2F%3Fa%3D1%26b%3D2'
+                '&from=/en/article/">example</a></p>')
+
+    def test_internal_links_are_not_rewritten(self):
+        html = b'<a href="/en/article/">article</a>'
+
+        self.assertEqual(b''.join(StreamingExternalLinkRewriter().rewrite([html])), html)
+
+
+class MarkdownExternalLinksTests(TestCase):
+    def test_links_come_back_to_the_current_path(self):
+        cache.clear()
+        block = MarkdownBlock()
+
+        for path in ('/en/article/', '/en/other-article/'):
+            html = block.render_basic('[example](https://example.com)', {'request': RequestFactory().get(path)})
+
+            self.assertIn(f'/en/external-link/?next=https%3A%2F%2Fexample.com&from={path}', html)
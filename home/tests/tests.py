@@ -1,11 +1,19 @@
-from django.test import TestCase, Client
+import gzip
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.template import Context, Template
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.http import HttpRequest
 from django.urls import reverse
 from rest_framework import status
-from wagtail.core.models import PageViewRestriction
+from wagtail.core.models import PageViewRestriction, Site
 
 from home.factories import ArticleFactory, SectionFactory
-from home.models import HomePage
+from home.models import Article, CacheSettings, HomePage, Section, SiteSettings
+from home.utils import compression, page_cache
 from iogt_users.factories import UserFactory
 from home.wagtail_hooks import limit_page_chooser
 
@@ -60,3 +68,206 @@ class LimitPageChooserHookTests(TestCase):
         pages_after = limit_page_chooser(pages_before, request)
 
         self.assertEqual(pages_after, pages_before)
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+class AnonymousPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserFactory()
+        self.home_page = HomePage.objects.first()
+        self.article = ArticleFactory.build(owner=self.user, title='Original title')
+        self.home_page.add_child(instance=self.article)
+        self.article.save_revision().publish()
+
+    def test_anonymous_response_is_cached_until_published(self):
+        response = self.client.get(self.article.url)
+        self.assertContains(response, 'Original title')
+
+        Article.objects.filter(pk=self.article.pk).update(title='Changed title')
+        response = self.client.get(self.article.url)
+        self.assertContains(response, 'Original title')
+
+        self.article.title = 'Published title'
+        self.article.save_revision().publish()
+        response = self.client.get(self.article.url)
+        self.assertContains(response, 'Published title')
+
+    def test_logged_in_user_bypasses_cache(self):
+        self.client.get(self.article.url)
+        Article.objects.filter(pk=self.article.pk).update(title='Changed title')
+
+        self.client.force_login(self.user)
+        response = self.client.get(self.article.url)
+        self.assertContains(response, 'Changed title')
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+class CompressionMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.home_page = HomePage.objects.first()
+        self.article = ArticleFactory.build(title='Compressed article')
+        self.home_page.add_child(instance=self.article)
+        self.article.save_revision().publish()
+        session = self.client.session
+        session['first_time_user'] = False
+        session.save()
+
+    def test_negotiate_encoding(self):
+        self.assertEqual(compression.negotiate_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(compression.negotiate_encoding('gzip, br;q=0.5'), 'gzip')
+        self.assertEqual(compression.negotiate_encoding('identity'), None)
+        self.assertEqual(compression.negotiate_encoding('*'), 'br')
+
+    def test_cached_pages_are_compressed_once(self):
+        response = self.client.get(self.article.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn(b'Compressed article', gzip.decompress(response.content))
+
+        with mock.patch('home.utils.compression.compress') as compress:
+            response = self.client.get(self.article.url, HTTP_ACCEPT_ENCODING='gzip')
+        compress.assert_not_called()
+        self.assertIn(b'Compressed article', gzip.decompress(response.content))
+
+        stats = compression.get_stats()['wagtail_serve']
+        self.assertEqual(stats['responses'], 2)
+        self.assertEqual(stats['cached_variants'], 1)
+        self.assertGreater(stats['saved_bytes'], 0)
+
+
+@override_settings(NAVIGATION_CACHE_ENABLED=True)
+class NavigationCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get('/')
+        self.template = Template(
+            "{% load home_tags %}{% navigation_cache 'footer' %}{% footer %}{% endnavigation_cache %}")
+
+    def test_warm_navigation_cache_costs_no_queries(self):
+        content = self.template.render(Context({'request': self.request}))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.template.render(Context({'request': self.request})), content)
+
+    def test_navigation_cache_is_purged(self):
+        self.template.render(Context({'request': self.request}))
+        page_cache.purge_all()
+
+        with self.assertNumQueries(2):
+            self.template.render(Context({'request': self.request}))
+
+
+class SiteSettingsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.site = Site.objects.get(is_default_site=True)
+
+    def get_request(self):
+        return RequestFactory().get('/', HTTP_HOST=self.site.hostname)
+
+    def test_warm_settings_cost_no_queries(self):
+        SiteSettings.for_request(self.get_request())
+        CacheSettings.for_request(self.get_request())
+        SiteSettings.get_for_default_site()
+
+        with self.assertNumQueries(0):
+            request = self.get_request()
+            self.assertEqual(SiteSettings.for_request(request).site, self.site)
+            self.assertTrue(CacheSettings.for_request(request).cache)
+            self.assertIsNone(SiteSettings.get_for_default_site().logo)
+
+    def test_settings_are_invalidated_on_save(self):
+        self.assertFalse(SiteSettings.for_request(self.get_request()).allow_anonymous_comment)
+
+        site_settings = SiteSettings.for_site(self.site)
+        site_settings.allow_anonymous_comment = True
+        site_settings.save()
+
+        self.assertTrue(SiteSettings.for_request(self.get_request()).allow_anonymous_comment)
+        self.assertTrue(SiteSettings.get_for_default_site().allow_anonymous_comment)
+
+
+class SectionChildrenQueryTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.home_page = HomePage.objects.first()
+        self.section = SectionFactory.build(owner=self.user)
+        self.home_page.add_child(instance=self.section)
+        # Create the site settings on the first request
+        self.client.get(self.section.url)
+
+    def add_children(self, count):
+        for _ in range(count):
+            self.section.add_child(instance=ArticleFactory.build(owner=self.user))
+            self.section.add_child(instance=SectionFactory.build(owner=self.user))
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.section.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_number_of_queries_does_not_depend_on_number_of_children(self):
+        self.add_children(2)
+        query_count = self.count_queries()
+
+        self.add_children(10)
+        self.assertEqual(self.count_queries(), query_count)
+
+
+class ProgressIndexTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.home_page = HomePage.objects.first()
+        self.section = SectionFactory.build(owner=self.user, show_progress_bar=True)
+        self.home_page.add_child(instance=self.section)
+        self.section.save_revision().publish()
+        self.articles = []
+        for _ in range(3):
+            article = ArticleFactory.build(owner=self.user)
+            self.section.add_child(instance=article)
+            article.save_revision().publish()
+            self.articles.append(article)
+
+    def get_progress(self, user):
+        request = HttpRequest()
+        request.user = user
+        request.session = {}
+        return self.section.get_user_progress_dict(request)
+
+    def test_progress_of_user(self):
+        self.user.read_articles.add(self.articles[0])
+
+        self.assertEqual(self.get_progress(self.user), {'read': 1, 'total': 3})
+
+    def test_unpublished_article_is_removed_from_index(self):
+        self.user.read_articles.add(self.articles[0])
+        self.articles[0].unpublish()
+
+        self.assertEqual(self.get_progress(self.user), {'read': 0, 'total': 2})
+
+
+class ProgressBarEligibleSectionsTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.home_page = HomePage.objects.first()
+        self.progress_section = SectionFactory.build(owner=self.user, show_progress_bar=True)
+        self.other_section = SectionFactory.build(owner=self.user)
+        self.home_page.add_child(instance=self.progress_section)
+        self.home_page.add_child(instance=self.other_section)
+        self.sub_section = SectionFactory.build(owner=self.user)
+        self.progress_section.add_child(instance=self.sub_section)
+        self.sub_sub_section = SectionFactory.build(owner=self.user)
+        self.sub_section.add_child(instance=self.sub_sub_section)
+
+    def test_descendants_of_progress_bar_sections_are_not_eligible(self):
+        with self.assertNumQueries(1):
+            eligible_sections = set(Section.get_progress_bar_eligible_sections())
+
+        self.assertEqual(eligible_sections, {self.progress_section, self.other_section})
+
+    def test_progress_bar_enabled_section_above(self):
+        self.assertEqual(Section.get_progress_bar_enabled_section_above(self.sub_sub_section), self.progress_section)
+        self.assertIsNone(Section.get_progress_bar_enabled_section_above(self.progress_section))
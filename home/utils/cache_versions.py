@@ -0,0 +1,23 @@
+import uuid
+
+from django.core.cache import cache
+
+
+def get_version(key):
+    """
+    :return: the current version stored under the key, shared by every process
+    through the cache. Caches and per process snapshots tagged with an older version
+    are stale.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_versions(*keys):
+    """
+    Make the caches and snapshots tagged with the current versions of the keys stale.
+    """
+    cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
@@ -0,0 +1,11 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_shared_cache(alias='default'):
+    """
+    :return: whether the cache is shared by the processes of the website, unlike the
+    local memory cache Django uses when CACHES isn't configured
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
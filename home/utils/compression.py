@@ -0,0 +1,156 @@
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.text import compress_sequence
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BROTLI = 'br'
+GZIP = 'gzip'
+
+VARIANT_KEY = 'compressed_response:{encoding}:{digest}'
+STATS_PATTERN_COUNT_KEY = 'compression_stats:pattern_count'
+STATS_PATTERN_KEY = 'compression_stats:pattern:{index}'
+STATS_KEY = 'compression_stats:{pattern}:{counter}'
+STATS_COUNTERS = ('responses', 'original_bytes', 'compressed_bytes', 'cached_variants')
+
+
+def get_supported_encodings():
+    return (BROTLI, GZIP) if brotli else (GZIP,)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    :return: the supported encoding the client prefers, brotli over gzip when both are
+    equally acceptable, or None
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        encoding, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        qualities[encoding.strip().lower()] = quality
+
+    acceptable = [(qualities.get(encoding, qualities.get('*', 0)), -index, encoding)
+                  for index, encoding in enumerate(get_supported_encodings())]
+    quality, _, encoding = max(acceptable)
+    return encoding if quality > 0 else None
+
+
+def compress(content, encoding):
+    if encoding == BROTLI:
+        return brotli.compress(content, mode=brotli.MODE_TEXT, quality=5)
+    return gzip.compress(content, compresslevel=6)
+
+
+def compress_streaming(sequence, encoding):
+    if encoding == GZIP:
+        yield from compress_sequence(sequence)
+        return
+
+    compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=5)
+    for chunk in sequence:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def get_or_compress(content, encoding, store=False):
+    """
+    Compressed variants are cached by the digest of the content, so pages served from
+    the page cache are compressed once per encoding instead of once per request.
+    :param store: whether to cache the compressed variant
+    :return: the compressed content and whether it came from the cache
+    """
+    if not store:
+        return compress(content, encoding), False
+
+    cache_key = VARIANT_KEY.format(encoding=encoding, digest=hashlib.sha1(content).hexdigest())
+    compressed = cache.get(cache_key)
+    if compressed is not None:
+        return compressed, True
+
+    compressed = compress(content, encoding)
+    cache.set(cache_key, compressed, getattr(settings, 'PAGE_CACHE_TIMEOUT', 300))
+    return compressed, False
+
+
+def _get_stats_key(pattern, counter):
+    return STATS_KEY.format(pattern=hashlib.md5(pattern.encode('utf-8')).hexdigest(), counter=counter)
+
+
+def _incr(key, delta):
+    """
+    :return: whether the key existed and was incremented
+    """
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        return False
+    return True
+
+
+def _add_to_counter(key, delta):
+    if not _incr(key, delta) and not cache.add(key, delta, None):
+        # Created in the meantime
+        cache.incr(key, delta)
+
+
+def _get_patterns():
+    count = cache.get(STATS_PATTERN_COUNT_KEY, 0)
+    keys = [STATS_PATTERN_KEY.format(index=index) for index in range(1, count + 1)]
+    return set(cache.get_many(keys).values())
+
+
+def record_stats(pattern, original_bytes, compressed_bytes, cached_variant):
+    """
+    Add the response to the counters of the URL pattern. The counters are only
+    incremented, so that concurrent responses don't lose each other's counts. The
+    pattern is registered when its first response creates its counters.
+    """
+    responses_key = _get_stats_key(pattern, 'responses')
+    if not _incr(responses_key, 1):
+        if cache.add(responses_key, 1, None):
+            cache.add(STATS_PATTERN_COUNT_KEY, 0, None)
+            index = cache.incr(STATS_PATTERN_COUNT_KEY)
+            cache.set(STATS_PATTERN_KEY.format(index=index), pattern, None)
+        else:
+            cache.incr(responses_key)
+
+    _add_to_counter(_get_stats_key(pattern, 'original_bytes'), original_bytes)
+    _add_to_counter(_get_stats_key(pattern, 'compressed_bytes'), compressed_bytes)
+    if cached_variant:
+        _add_to_counter(_get_stats_key(pattern, 'cached_variants'), 1)
+
+
+def get_stats():
+    """
+    :return: the counters of each URL pattern, with the bytes saved by compression
+    """
+    stats = {}
+    for pattern in sorted(_get_patterns()):
+        keys = {_get_stats_key(pattern, counter): counter for counter in STATS_COUNTERS}
+        values = cache.get_many(keys)
+        counters = {counter: values.get(key, 0) for key, counter in keys.items()}
+        counters['saved_bytes'] = counters['original_bytes'] - counters['compressed_bytes']
+        stats[pattern] = counters
+    return stats
+
+
+def reset_stats():
+    count = cache.get(STATS_PATTERN_COUNT_KEY, 0)
+    cache.delete_many([_get_stats_key(pattern, counter)
+                       for pattern in _get_patterns() for counter in STATS_COUNTERS])
+    cache.delete_many([STATS_PATTERN_KEY.format(index=index) for index in range(1, count + 1)])
+    cache.delete(STATS_PATTERN_COUNT_KEY)
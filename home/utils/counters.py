@@ -0,0 +1,11 @@
+from django.db import models
+
+
+def add_to_counter(model, counter, amount, **lookups):
+    """
+    Add the amount to the `counter` field of the row matching the lookups, creating
+    the row with its default count if it doesn't exist yet. The lookups must be unique
+    together.
+    """
+    model.objects.bulk_create([model(**lookups)], ignore_conflicts=True)
+    model.objects.filter(**lookups).update(**{counter: models.F(counter) + amount})
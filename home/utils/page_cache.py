@@ -0,0 +1,134 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import translation
+from wagtail.core.models import Site
+
+from home.utils.cache_versions import bump_versions, get_version
+from questionnaires import submitted
+
+# Rendered in place of the CSRF token of cacheable pages and replaced with the
+# token of the current visitor every time the page is served.
+CSRF_TOKEN_PLACEHOLDER = 'page-cache-csrf-token-placeholder'
+
+GLOBAL_VERSION_KEY = 'page_cache:version'
+PAGE_VERSION_KEY = 'page_cache:version:{}'
+
+
+def is_enabled():
+    return getattr(settings, 'PAGE_CACHE_ENABLED', False)
+
+
+def is_cacheable_request(request):
+    """
+    Only anonymous GET requests without query parameters, without pending
+    messages and from visitors who haven't submitted questionnaires, whose embedded
+    questionnaires are rendered without their form, share the same rendered response.
+    """
+    return (
+        is_enabled()
+        and request.method in ('GET', 'HEAD')
+        and not request.GET
+        and request.user.is_anonymous
+        and not getattr(request, 'is_preview', False)
+        and not len(messages.get_messages(request))
+        and not submitted.get_submitted_page_ids(request)
+    )
+
+
+def _digest(value):
+    return hashlib.md5(repr(value).encode('utf-8')).hexdigest()
+
+
+def get_cache_key(request, page, variant=None):
+    """
+    :param variant: the per-request state the rendered page depends on,
+    e.g. the progress of the user.
+    """
+    site = Site.find_for_request(request)
+    return 'page_cache:{site}:{locale}:{path}:{version}:{page_version}:{variant}'.format(
+        site=site.pk if site else None,
+        locale=getattr(request, 'LANGUAGE_CODE', settings.LANGUAGE_CODE),
+        path=_digest(request.path),
+        version=get_version(GLOBAL_VERSION_KEY),
+        page_version=get_version(PAGE_VERSION_KEY.format(page.pk)),
+        variant=_digest(variant),
+    )
+
+
+def _insert_csrf_token(request, content):
+    if CSRF_TOKEN_PLACEHOLDER.encode() in content:
+        content = content.replace(CSRF_TOKEN_PLACEHOLDER.encode(), get_token(request).encode())
+    return content
+
+
+def get_cached_response(request, cache_key):
+    cached = cache.get(cache_key)
+    if cached is None:
+        return None
+
+    content, content_type = cached
+    return HttpResponse(_insert_csrf_token(request, content), content_type=content_type)
+
+
+def cache_response(request, cache_key, response):
+    """
+    Store the rendered response unless it depends on the current visitor, then
+    fill in the CSRF token of the visitor.
+    """
+    is_cacheable = (
+        response.status_code == 200
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_USED')
+    )
+    if is_cacheable:
+        cache.set(cache_key, (response.content, response['Content-Type']),
+                  getattr(settings, 'PAGE_CACHE_TIMEOUT', 300))
+
+    response.content = _insert_csrf_token(request, response.content)
+    return response
+
+
+def is_navigation_cache_enabled():
+    return getattr(settings, 'NAVIGATION_CACHE_ENABLED', False)
+
+
+def get_fragment_cache_key(fragment_name, request):
+    """
+    Navigation fragments are the same for every page of a site in a locale and share
+    the version of the whole page cache, see purge_all.
+    """
+    site = Site.find_for_request(request) if request else None
+    return 'page_cache:fragment:{name}:{site}:{locale}:{version}'.format(
+        name=fragment_name,
+        site=site.pk if site else None,
+        locale=translation.get_language(),
+        version=get_version(GLOBAL_VERSION_KEY),
+    )
+
+
+def get_or_render_fragment(fragment_name, request, render):
+    if not is_navigation_cache_enabled():
+        return render()
+
+    cache_key = get_fragment_cache_key(fragment_name, request)
+    content = cache.get(cache_key)
+    if content is None:
+        content = render()
+        cache.set(cache_key, content, getattr(settings, 'NAVIGATION_CACHE_TIMEOUT', 60 * 60))
+    return content
+
+
+def purge_pages(page_ids):
+    bump_versions(*(PAGE_VERSION_KEY.format(page_id) for page_id in page_ids))
+
+
+def purge_all():
+    """
+    Purge every cached page and navigation fragment.
+    """
+    bump_versions(GLOBAL_VERSION_KEY)
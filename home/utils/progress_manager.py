@@ -1,21 +1,31 @@
+from django.apps import apps
+from django.db.models import Count, Q
+
+
 class ProgressManager:
 
     def __init__(self, request):
         self.request = request
 
-    def get_progress(self, section):
+    def _get_read_articles_filter(self):
         user = self.request.user
-        if self.request.user.is_anonymous:
-            read_article_ids = set(self.request.session.get('read_articles', []))
-        else:
-            read_article_ids = set(user.read_articles.values_list('pk', flat=True))
+        if user.is_anonymous:
+            read_article_ids = self.request.session.get('read_articles', [])
+            return Q(article_id__in=read_article_ids) if read_article_ids else None
 
+        return Q(article_id__in=user.read_articles.through.objects.filter(user_id=user.pk).values('article_id'))
+
+    def get_progress(self, section):
         progress_enabled_ancestor = section.get_progress_bar_enabled_ancestor()
         if progress_enabled_ancestor:
-            section_articles = progress_enabled_ancestor.get_descendant_articles()
-            section_article_ids = set(section_articles.values_list('pk', flat=True))
+            ProgressSectionArticle = apps.get_model('home', 'ProgressSectionArticle')
+            section_articles = ProgressSectionArticle.objects.filter(section=progress_enabled_ancestor)
 
-            read_section_articles = read_article_ids.intersection(section_article_ids)
+            read_articles_filter = self._get_read_articles_filter()
+            if read_articles_filter is None:
+                return 0, section_articles.count()
 
-            return len(read_section_articles), len(section_article_ids)
+            progress = section_articles.aggregate(
+                read=Count('pk', filter=read_articles_filter), total=Count('pk'))
+            return progress['read'], progress['total']
         return None, None
@@ -0,0 +1,79 @@
+import copy
+
+from django.http.request import split_domain_port
+from wagtail.core.models import Site
+from wagtail.core.utils import InvokeViaAttributeShortcut
+
+from home.utils.cache_versions import bump_versions, get_version
+
+VERSION_KEY = 'site_settings:version'
+
+
+class _Snapshot:
+    def __init__(self, version):
+        self.version = version
+        # {(hostname, port): site}, with the default site under None
+        self.sites = {}
+        # {(setting model label, site pk): setting instance}
+        self.settings = {}
+
+
+_snapshot = _Snapshot(None)
+
+
+def _get_snapshot():
+    global _snapshot
+    version = get_version(VERSION_KEY)
+    if _snapshot.version != version:
+        _snapshot = _Snapshot(version)
+    return _snapshot
+
+
+def find_site_for_request(request):
+    """
+    Same as Site.find_for_request, from the per process snapshot of the sites.
+    """
+    if not hasattr(request, '_wagtail_site'):
+        sites = _get_snapshot().sites
+        key = (split_domain_port(request.get_host())[0], request.get_port())
+        if key not in sites:
+            sites[key] = Site._find_for_request(request)
+        request._wagtail_site = sites[key]
+    return request._wagtail_site
+
+
+def get_default_site():
+    sites = _get_snapshot().sites
+    if None not in sites:
+        sites[None] = Site.objects.filter(is_default_site=True).first()
+    return sites[None]
+
+
+def _copy(instance):
+    # The cached instance is shared by every request of the process, each caller gets
+    # a copy so that the request and page urls set on it stay with the caller.
+    copied = copy.copy(instance)
+    copied._state = copy.copy(instance._state)
+    copied._state.fields_cache = dict(instance._state.fields_cache)
+    copied._page_url_cache = {}
+    copied.page_url = InvokeViaAttributeShortcut(copied, 'get_page_url')
+    return copied
+
+
+def get_setting(model, site):
+    """
+    :return: the setting of the site from the per process snapshot, created with its
+    default values if needed
+    """
+    settings = _get_snapshot().settings
+    key = (model._meta.label_lower, site.pk if site else None)
+    if key not in settings:
+        settings[key] = model.for_site(site)
+    return _copy(settings[key])
+
+
+def invalidate():
+    """
+    Invalidate the snapshots of every process.
+    """
+    bump_versions(VERSION_KEY)
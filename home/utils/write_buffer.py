@@ -0,0 +1,93 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from home.utils.caches import is_shared_cache
+
+# Put in the slot of an event which wasn't written yet when the buffer was flushed,
+# the writer then records the event in the next slot. Kept long enough for the writer
+# to find it.
+SKIPPED = 'write_buffer:skipped'
+SKIPPED_TIMEOUT = 60 * 60
+
+
+class WriteBuffer:
+    """
+    Buffers events in the cache and writes them to the database in bulk with `save`
+    once the number of buffered events reaches the `size_setting` or the oldest one is
+    older than the `timeout_setting` (seconds). A size of 0 or 1 saves every event
+    immediately, as does a cache which isn't shared by the processes (see
+    is_shared_cache), since the events would only be visible to the process which
+    buffered them and be lost when it stops.
+
+    Each event is written to its own slot, numbered by a counter. A flush saves the
+    slots up to the counter, the slots reserved but not written yet are marked as
+    skipped so that their writers move their event to a new slot.
+    """
+
+    def __init__(self, name, save, size_setting, timeout_setting):
+        self.save = save
+        self.size_setting = size_setting
+        self.timeout_setting = timeout_setting
+        self.counter_key = f'{name}:counter'
+        self.flushed_key = f'{name}:flushed'
+        self.started_at_key = f'{name}:started_at'
+        self.lock_key = f'{name}:lock'
+        self.event_key = f'{name}:event:{{}}'
+
+    def record(self, event):
+        buffer_size = getattr(settings, self.size_setting, 0)
+        if buffer_size <= 1 or not is_shared_cache():
+            self.save([event])
+            return
+
+        cache.add(self.counter_key, 0, None)
+        index = cache.incr(self.counter_key)
+        while not cache.add(self.event_key.format(index), event, None):
+            # The slot was skipped by a flush in the meantime
+            index = cache.incr(self.counter_key)
+        cache.add(self.started_at_key, time.time(), None)
+
+        flushed = cache.get(self.flushed_key, 0)
+        if index <= flushed:
+            # The counter was evicted and started again
+            cache.set(self.flushed_key, 0, None)
+            flushed = 0
+        buffered = index - flushed
+        started_at = cache.get(self.started_at_key) or time.time()
+        if buffered >= buffer_size or time.time() - started_at >= getattr(settings, self.timeout_setting, 60):
+            self.flush()
+
+    def flush(self):
+        """
+        Save the buffered events.
+        :return: the number of saved events
+        """
+        if not cache.add(self.lock_key, True, 60):
+            # Another process is flushing the buffer
+            return 0
+        try:
+            last = cache.get(self.counter_key, 0)
+            first = cache.get(self.flushed_key, 0)
+            if last < first:
+                # The counter was evicted and started again
+                first = 0
+            if last <= first:
+                return 0
+
+            keys = [self.event_key.format(index) for index in range(first + 1, last + 1)]
+            events = cache.get_many(keys)
+            for key in keys:
+                if key not in events and not cache.add(key, SKIPPED, SKIPPED_TIMEOUT):
+                    # Written since get_many
+                    events[key] = cache.get(key)
+            events = {key: event for key, event in events.items() if event not in (None, SKIPPED)}
+            cache.set(self.flushed_key, last, None)
+            cache.delete(self.started_at_key)
+
+            self.save(events.values())
+            cache.delete_many(events.keys())
+            return len(events)
+        finally:
+            cache.delete(self.lock_key)
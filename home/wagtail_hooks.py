@@ -3,7 +3,6 @@ from urllib.parse import urlparse
 
 from django.core.exceptions import PermissionDenied
 from django.urls import resolve
-from django.urls import reverse
 from django.utils.html import escape
 from django.utils.translation import gettext_lazy as _
 from wagtail.core import hooks
@@ -11,6 +10,7 @@ from wagtail.core.models import Page
 from wagtail.core.models import PageViewRestriction
 from wagtail.core.rich_text import LinkHandler
 
+from external_links.utils import get_external_link_url, is_external_link
 from home.models import FooterIndexPage, BannerIndexPage, Section, \
     SectionIndexPage
 
@@ -20,9 +20,10 @@ class ExternalLinkHandler(LinkHandler, ABC):
 
     @classmethod
     def expand_db_attributes(cls, attrs):
-        next_page = escape(attrs["href"])
-        external_link_page = reverse("external-link")
-        return f'<a href="{external_link_page}?next={next_page}">'
+        href = attrs["href"]
+        if is_external_link(href):
+            href = get_external_link_url(href)
+        return f'<a href="{escape(href)}">'
 
 
 @hooks.register("register_rich_text_features")
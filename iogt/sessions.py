@@ -0,0 +1,64 @@
+import json
+
+from django.core.signing import JSONSerializer
+
+INT_SET_KEY = '__ints__'
+
+
+def encode_int_set(values):
+    """
+    Encode a set of non negative integers as the base 36 differences between the sorted
+    integers, e.g. {12, 15, 16, 40} as 'c,3,1,o'.
+    """
+    encoded = []
+    previous = 0
+    for value in sorted(values):
+        encoded.append(_to_base36(value - previous))
+        previous = value
+    return ','.join(encoded)
+
+
+def decode_int_set(encoded):
+    values = set()
+    value = 0
+    for delta in encoded.split(',') if encoded else ():
+        value += int(delta, 36)
+        values.add(value)
+    return values
+
+
+def _to_base36(number):
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    encoded = ''
+    while True:
+        number, remainder = divmod(number, 36)
+        encoded = digits[remainder] + encoded
+        if not number:
+            return encoded
+
+
+class _Encoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, (set, frozenset)) and all(isinstance(value, int) and value >= 0 for value in o):
+            return {INT_SET_KEY: encode_int_set(o)}
+        return super().default(o)
+
+
+def _object_hook(obj):
+    if len(obj) == 1 and INT_SET_KEY in obj:
+        return decode_int_set(obj[INT_SET_KEY])
+    return obj
+
+
+class CompactJSONSerializer(JSONSerializer):
+    """
+    Session serializer which also stores sets of integers, e.g. the articles read by an
+    anonymous user, compactly as delta encoded strings. They are loaded as sets so that
+    checking whether an article was read doesn't scan a list.
+    """
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'), cls=_Encoder).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'), object_hook=_object_hook)
@@ -77,6 +77,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'home.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -356,6 +357,24 @@ LOCALE_PATHS = [
 RAPIDPRO_BOT_USER_ID = os.getenv('RAPIDPRO_BOT_USER_ID')
 RAPIDPRO_BOT_USER_USERNAME = os.getenv('RAPIDPRO_BOT_USER_USERNAME')
 RAPIDPRO_BOT_USER_PASSWORD = os.getenv('RAPIDPRO_BOT_USER_PASSWORD')
+# Messages to RapidPro channels are delivered immediately. With
+# RAPIDPRO_OUTBOX_ENABLED they are queued instead and delivered by
+# `manage.py send_rapidpro_messages`, which must then be run next to the website.
+# Failed deliveries are retried after RAPIDPRO_OUTBOX_RETRY_DELAY seconds, doubled
+# after every attempt up to RAPIDPRO_OUTBOX_MAX_RETRY_DELAY, and given up after
+# RAPIDPRO_OUTBOX_MAX_ATTEMPTS. Delivered messages are deleted after
+# RAPIDPRO_OUTBOX_KEEP_SENT_DAYS.
+RAPIDPRO_OUTBOX_ENABLED = False
+RAPIDPRO_OUTBOX_WORKERS = 8
+# Per worker process
+RAPIDPRO_CHANNEL_CONCURRENCY = 4
+RAPIDPRO_OUTBOX_KEEP_SENT_DAYS = 7
+# The number of RapidPro servers to keep connections open to
+RAPIDPRO_CONNECTION_POOLS = 10
+RAPIDPRO_OUTBOX_RETRY_DELAY = 30
+RAPIDPRO_OUTBOX_MAX_RETRY_DELAY = 60 * 60
+RAPIDPRO_OUTBOX_MAX_ATTEMPTS = 8
+RAPIDPRO_REQUEST_TIMEOUT = 10
 
 WAGTAILTRANSFER_SOURCES = {
     'iogt_global': {
@@ -377,7 +396,87 @@ WAGTAIL_RICH_TEXT_FIELD_FEATURES = [
     'image',
 ]
 
+# External links are rewritten to go via a message page when rich text, Markdown
+# and templates are rendered. Enable this to also rewrite the external links left
+# in any other HTML response, which scans the whole body of every HTML response.
+REWRITE_EXTERNAL_LINKS_IN_RESPONSES = False
+
+# Set the BACKEND to 'search.backend' for ranked, partial and diacritic
+# insensitive search without an external cluster, then run `manage.py
+# update_index` to index the existing content.
+WAGTAILSEARCH_BACKENDS = {
+    'default': {
+        'BACKEND': 'wagtail.search.backends.db',
+    }
+}
+
 # Search results
 SEARCH_RESULTS_PER_PAGE = 10
+# The ids of the results of each query are cached per locale for this many
+# seconds, up to SEARCH_RESULTS_LIMIT results per query
+SEARCH_RESULTS_CACHE_TIMEOUT = 60
+SEARCH_RESULTS_LIMIT = 1000
+# Search hits are buffered in the cache and rolled up into the daily hits per
+# query and locale once this many hits are buffered or the oldest one is older
+# than the timeout (seconds). `manage.py flush_search_hits` writes the buffer
+# immediately. A SEARCH_HITS_BUFFER_SIZE of 0 or 1 writes every hit immediately,
+# as does a default cache which isn't shared by the processes (e.g. the local
+# memory cache used when CACHES isn't configured).
+SEARCH_HITS_BUFFER_SIZE = 100
+SEARCH_HITS_BUFFER_TIMEOUT = 60
+
+# Anonymous page cache. Only enable it with a shared CACHES backend (e.g.
+# memcached or redis): pages are purged by bumping versions in the cache, so with
+# a per process cache other processes serve stale pages until the timeout.
+# Compressed variants of cached pages are kept with it.
+PAGE_CACHE_ENABLED = False
+PAGE_CACHE_TIMEOUT = 60 * 5
+# Footer, top level sections and flat menus, per site and locale. Like the page
+# cache, only enable it with a shared CACHES backend.
+NAVIGATION_CACHE_ENABLED = False
+NAVIGATION_CACHE_TIMEOUT = 60 * 60
+
+# Article reads of logged in users are buffered in the cache and written in bulk
+# once this many reads are buffered or the oldest one is older than the timeout
+# (seconds). `manage.py flush_article_reads` writes the buffer immediately.
+# A READ_ARTICLES_BUFFER_SIZE of 0 or 1 writes every read immediately, as does a
+# default cache which isn't shared by the processes.
+READ_ARTICLES_BUFFER_SIZE = 100
+READ_ARTICLES_BUFFER_TIMEOUT = 60
+
+# Questionnaires each logged in user has submitted are cached for this many seconds
+SUBMITTED_QUESTIONNAIRES_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Sessions are read from the cache and written through to the database. Configure
+# a shared CACHES backend when running more than one process.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_SERIALIZER = 'iogt.sessions.CompactJSONSerializer'
+
+# Answers of multi-step questionnaires are kept in a draft store until the last
+# step, per user or per session for anonymous users. Drafts expire this many
+# seconds after the last answered step, run `manage.py
+# delete_expired_questionnaire_drafts` periodically to delete them. Larger drafts
+# (bytes of JSON) are refused. 'questionnaires.drafts.CacheDraftStore' keeps the
+# drafts in QUESTIONNAIRE_DRAFT_CACHE instead, which must be a shared cache that
+# doesn't evict entries before they expire.
+QUESTIONNAIRE_DRAFT_STORE = 'questionnaires.drafts.DatabaseDraftStore'
+QUESTIONNAIRE_DRAFT_CACHE = 'default'
+QUESTIONNAIRE_DRAFT_TIMEOUT = 60 * 60 * 24
+QUESTIONNAIRE_DRAFT_MAX_SIZE = 64 * 1024
+
+# Paths, with or without a language prefix, logged in users who haven't filled
+# the registration survey can visit without being redirected to it
+REGISTRATION_SURVEY_EXEMPT_URL_PREFIXES = (
+    '/admin/',
+    '/django-admin/',
+    '/documents/',
+    '/static/',
+    '/media/',
+    '/sw.js',
+    '/manifest.webmanifest',
+    '/sitemap/',
+    '/wagtail-transfer/',
+    '/messaging/api/',
+)
 
 from .profanity_settings import *
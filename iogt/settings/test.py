@@ -17,3 +17,7 @@ ALLOWED_HOSTS = ['*']
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+READ_ARTICLES_BUFFER_SIZE = 0
+SEARCH_RESULTS_CACHE_TIMEOUT = 0
+SEARCH_HITS_BUFFER_SIZE = 0
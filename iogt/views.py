@@ -9,7 +9,7 @@ from questionnaires.models import Poll, Survey, Quiz
 
 
 def check_user_session(request):
-    if request.method == "POST":
+    if request.method == "POST" and request.session.get("first_time_user", True):
         request.session["first_time_user"] = False
 
 
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from iogt_users import read_tracking
+
+
+class Command(BaseCommand):
+    """
+    This command writes the article reads buffered in the cache to the database.
+    Run it periodically to bound how long a read stays in the buffer.
+    """
+
+    def handle(self, *args, **options):
+        count = read_tracking.flush()
+        self.stdout.write(self.style.SUCCESS(f'Successfully flushed {count} article reads'))
@@ -1,34 +1,52 @@
+from django.conf import settings
 from django.shortcuts import redirect
 from django.urls import resolve
+from django.utils.translation import get_language_from_path
 
-from home.models import SiteSettings
+from iogt_users.registration_survey import get_registration_survey
 
 
 class RegistrationSurveyRedirectMiddleware:
     """
     The purpose of this middleware is to make the registration survey form
     mandatory. See https://github.com/unicef/iogt/issues/113 for details
+
+    Anonymous users, users who filled the registration survey and exempt paths
+    (see REGISTRATION_SURVEY_EXEMPT_URL_PREFIXES) don't hit the database. The
+    registration survey of each site is kept in a per process snapshot which is
+    invalidated when the site settings, the survey or the site change.
     """
 
+    allowed_url_names = ['account_logout']
+
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        site_settings = SiteSettings.for_request(request)
-        if site_settings.registration_survey:
-            is_registration_survey_url = request.path_info == site_settings.registration_survey.url
-        else:
-            is_registration_survey_url = False
-
-        allowed_url_names = ['account_logout']
-        current_url = resolve(request.path_info).url_name
-        is_url_allowed = current_url in allowed_url_names or is_registration_survey_url
-
-        is_registered_user = not request.user.is_anonymous
-
-        if is_registered_user and not request.user.has_filled_registration_survey \
-                and not is_url_allowed and site_settings.registration_survey:
-            site_settings = SiteSettings.for_request(request)
-            return redirect(site_settings.registration_survey.url)
+        if self.is_redirect_required(request):
+            return redirect(get_registration_survey(request)[1])
 
         return self.get_response(request)
+
+    def is_redirect_required(self, request):
+        user = request.user
+        if user.is_anonymous or user.has_filled_registration_survey:
+            return False
+        if self.is_exempt_path(request.path_info):
+            return False
+
+        registration_survey = get_registration_survey(request)
+        if not registration_survey:
+            return False
+
+        _, survey_url = registration_survey
+        if request.path_info == survey_url:
+            return False
+        return resolve(request.path_info).url_name not in self.allowed_url_names
+
+    @staticmethod
+    def is_exempt_path(path):
+        language_code = get_language_from_path(path)
+        if language_code:
+            path = path[len(language_code) + 1:]
+        return path.startswith(tuple(getattr(settings, 'REGISTRATION_SURVEY_EXEMPT_URL_PREFIXES', ())))
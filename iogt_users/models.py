@@ -5,6 +5,8 @@ from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from iogt_users import read_tracking
+
 
 class User(AbstractUser):
     first_name = models.CharField('first name', max_length=150, null=True,
@@ -30,18 +32,14 @@ class User(AbstractUser):
     def record_article_read(cls, request, article):
         user = request.user
         if user.is_anonymous:
-            read_articles = request.session.get('read_articles', [])
-            if read_articles:
-                if article.pk not in read_articles:
-                    # https://code.djangoproject.com/wiki/NewbieMistakes#Appendingtoalistinsessiondoesntwork
-                    read_articles = request.session['read_articles']
-                    read_articles.append(article.pk)
-                    request.session['read_articles'] = read_articles
-            else:
-                request.session['read_articles'] = [article.pk]
+            # A set, stored compactly by iogt.sessions.CompactJSONSerializer. Sessions
+            # saved before may still have a list.
+            read_articles = request.session.get('read_articles', set())
+            if article.pk not in read_articles:
+                # Only modify the session, and write it, for new reads
+                request.session['read_articles'] = {*read_articles, article.pk}
         else:
-            if not user.read_articles.filter(id=article.id).exists():
-                user.read_articles.add(article)
+            read_tracking.record(user.pk, article.pk)
 
     class Meta:
         ordering = ('id',)
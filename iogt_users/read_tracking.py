@@ -0,0 +1,35 @@
+from django.apps import apps
+
+from home.utils.write_buffer import WriteBuffer
+
+
+def _get_through_model():
+    return apps.get_model('iogt_users', 'User').read_articles.through
+
+
+def _save(reads):
+    ReadArticle = _get_through_model()
+    ReadArticle.objects.bulk_create(
+        [ReadArticle(user_id=user_id, article_id=article_id) for user_id, article_id in set(reads)],
+        ignore_conflicts=True,
+    )
+
+
+buffer = WriteBuffer('read_articles_buffer', _save, 'READ_ARTICLES_BUFFER_SIZE', 'READ_ARTICLES_BUFFER_TIMEOUT')
+
+
+def record(user_id, article_id):
+    """
+    Buffer the read in the cache and write the buffered reads to the database once
+    READ_ARTICLES_BUFFER_SIZE reads are buffered or the oldest buffered read is older
+    than READ_ARTICLES_BUFFER_TIMEOUT seconds.
+    """
+    buffer.record((user_id, article_id))
+
+
+def flush():
+    """
+    Write the buffered reads to the database.
+    :return: the number of buffered reads
+    """
+    return buffer.flush()
@@ -0,0 +1,37 @@
+from home.utils.cache_versions import bump_versions, get_version
+
+VERSION_KEY = 'registration_survey:version'
+
+# Per process snapshot of the registration survey of each host:
+# {host: (version, survey id, survey url)}
+_snapshot = {}
+
+
+def get_registration_survey(request):
+    """
+    :return: the id and url of the registration survey of the site of the request,
+    or None when the site has no registration survey
+    """
+    from home.models import SiteSettings
+
+    host = request.get_host()
+    version = get_version(VERSION_KEY)
+    snapshot = _snapshot.get(host)
+    if snapshot is None or snapshot[0] != version:
+        registration_survey = SiteSettings.for_request(request).registration_survey
+        snapshot = (
+            version,
+            registration_survey.pk if registration_survey else None,
+            registration_survey.url if registration_survey else None,
+        )
+        _snapshot[host] = snapshot
+
+    _, survey_id, survey_url = snapshot
+    return (survey_id, survey_url) if survey_id else None
+
+
+def invalidate():
+    """
+    Invalidate the snapshots of every process, see get_registration_survey.
+    """
+    bump_versions(VERSION_KEY)
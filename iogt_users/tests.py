@@ -1,10 +1,25 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core import management
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from wagtail.core.models import Site
 
 from home.factories import ArticleFactory
-from home.models import HomePage
+from home.models import HomePage, SiteSettings
+from iogt.sessions import CompactJSONSerializer
+from iogt_users import read_tracking
 from iogt_users.factories import UserFactory
+from iogt_users.middlewares import RegistrationSurveyRedirectMiddleware
+from questionnaires.models import Survey, UserSubmission
 
 
 class PostRegistrationRedirectTests(TestCase):
@@ -25,3 +40,179 @@ class PostRegistrationRedirectTests(TestCase):
     def test_anonymous_user_can_browse_public_urls(self):
         response = self.client.get(self.home_page.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class RegistrationSurveyRedirectMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserFactory(has_filled_registration_survey=False)
+        self.home_page = HomePage.objects.first()
+        self.survey = Survey(title='registration survey')
+        self.home_page.add_child(instance=self.survey)
+        self.site_settings = SiteSettings.for_site(Site.objects.get(is_default_site=True))
+        self.site_settings.registration_survey = self.survey
+        self.site_settings.save()
+        self.middleware = RegistrationSurveyRedirectMiddleware(lambda request: HttpResponse())
+
+    def get(self, path, user):
+        request = RequestFactory().get(path)
+        request.user = user
+        return self.middleware(request)
+
+    def test_users_who_need_no_redirect_do_not_hit_the_database(self):
+        home_page_url, survey_url = self.home_page.url, self.survey.url
+        cache.clear()
+        with self.assertNumQueries(0):
+            for path in [home_page_url, survey_url, '/en/search/', '/sw.js']:
+                self.assertEqual(self.get(path, AnonymousUser()).status_code, 200)
+            self.assertEqual(self.get(home_page_url, UserFactory.build()).status_code, 200)
+
+    def test_exempt_paths_do_not_hit_the_database(self):
+        cache.clear()
+        with self.assertNumQueries(0):
+            for prefix in settings.REGISTRATION_SURVEY_EXEMPT_URL_PREFIXES:
+                self.assertEqual(self.get(prefix, self.user).status_code, 200)
+                self.assertEqual(self.get(f'/en{prefix}', self.user).status_code, 200)
+
+    def test_registration_survey_is_looked_up_once(self):
+        home_page_url, survey_url = self.home_page.url, self.survey.url
+        response = self.get(home_page_url, self.user)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(response.url, survey_url)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(home_page_url, self.user).url, survey_url)
+            self.assertEqual(self.get(survey_url, self.user).status_code, 200)
+
+    def test_registration_survey_change_is_picked_up(self):
+        self.get(self.home_page.url, self.user)
+
+        self.site_settings.registration_survey = None
+        self.site_settings.save()
+
+        self.assertEqual(self.get(self.home_page.url, self.user).status_code, 200)
+
+
+class UsersExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin_user = UserFactory(is_superuser=True, is_staff=True)
+        self.survey = Survey(title='registration survey')
+        HomePage.objects.first().add_child(instance=self.survey)
+        site_settings = SiteSettings.for_site(Site.objects.get(is_default_site=True))
+        site_settings.registration_survey = self.survey
+        site_settings.save()
+        self.client.force_login(self.admin_user)
+
+    def export(self):
+        response = self.client.get(reverse('iogt_users_user_modeladmin_index'), {'export': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content).decode()
+
+    def test_number_of_queries_does_not_depend_on_number_of_users(self):
+        user = UserFactory()
+        UserSubmission.objects.create(page=self.survey, user=user, form_data='{"age": "10"}')
+        UserSubmission.objects.create(page=self.survey, user=user, form_data='{"age": "11"}')
+        self.export()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.export()
+        for _ in range(3):
+            UserFactory()
+        with self.assertNumQueries(len(queries)):
+            rows = self.export().splitlines()
+
+        self.assertEqual(len(rows), 6)
+        self.assertIn('"{""age"": ""11""}"', next(row for row in rows if row.startswith(user.username)))
+
+
+@override_settings(READ_ARTICLES_BUFFER_SIZE=3, READ_ARTICLES_BUFFER_TIMEOUT=60)
+class ReadArticlesBufferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Buffering requires a cache shared by the processes
+        patcher = mock.patch('home.utils.write_buffer.is_shared_cache', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = UserFactory()
+        self.home_page = HomePage.objects.first()
+        self.articles = []
+        for _ in range(3):
+            article = ArticleFactory.build(owner=self.user)
+            self.home_page.add_child(instance=article)
+            self.articles.append(article)
+
+    def test_reads_are_written_when_buffer_is_full(self):
+        read_tracking.record(self.user.pk, self.articles[0].pk)
+        read_tracking.record(self.user.pk, self.articles[1].pk)
+        self.assertEqual(self.user.read_articles.count(), 0)
+
+        read_tracking.record(self.user.pk, self.articles[1].pk)
+        self.assertEqual(set(self.user.read_articles.all()), {self.articles[0], self.articles[1]})
+
+    def test_read_is_kept_when_flushed_while_being_recorded(self):
+        incr = cache.incr
+        flushed = []
+
+        def incr_and_flush(*args, **kwargs):
+            index = incr(*args, **kwargs)
+            if not flushed:
+                # Flush between reserving the slot of the read and writing it
+                flushed.append(read_tracking.flush())
+            return index
+
+        read_tracking.record(self.user.pk, self.articles[0].pk)
+        with mock.patch.object(cache, 'incr', incr_and_flush):
+            read_tracking.record(self.user.pk, self.articles[1].pk)
+        self.assertEqual(flushed, [1])
+
+        read_tracking.flush()
+        self.assertEqual(set(self.user.read_articles.all()), {self.articles[0], self.articles[1]})
+
+    def test_reads_are_written_immediately_without_a_shared_cache(self):
+        with mock.patch('home.utils.write_buffer.is_shared_cache', return_value=False):
+            read_tracking.record(self.user.pk, self.articles[0].pk)
+
+        self.assertEqual(list(self.user.read_articles.all()), [self.articles[0]])
+
+    def test_reads_are_buffered_again_after_the_counter_is_evicted(self):
+        read_tracking.record(self.user.pk, self.articles[0].pk)
+        read_tracking.record(self.user.pk, self.articles[1].pk)
+        read_tracking.flush()
+        cache.delete(read_tracking.buffer.counter_key)
+
+        read_tracking.record(self.user.pk, self.articles[2].pk)
+
+        self.assertEqual(read_tracking.flush(), 1)
+        self.assertEqual(set(self.user.read_articles.all()), set(self.articles))
+
+    def test_flush_article_reads_command(self):
+        read_tracking.record(self.user.pk, self.articles[2].pk)
+
+        management.call_command('flush_article_reads', stdout=StringIO())
+
+        self.assertEqual(list(self.user.read_articles.all()), [self.articles[2]])
+
+
+class AnonymousReadArticlesTests(TestCase):
+    def setUp(self):
+        self.home_page = HomePage.objects.first()
+        self.article = ArticleFactory.build()
+        self.home_page.add_child(instance=self.article)
+
+    def test_read_articles_are_serialized_compactly(self):
+        serializer = CompactJSONSerializer()
+        session = {'read_articles': {12, 15, 16, 40, 1000}, 'first_time_user': False}
+
+        data = serializer.dumps(session)
+
+        self.assertIn(b'{"__ints__":"c,3,1,o,qo"}', data)
+        self.assertEqual(serializer.loads(data), session)
+        self.assertEqual(serializer.loads(b'{"read_articles":[1,2]}'), {'read_articles': [1, 2]})
+
+    def test_repeated_read_does_not_modify_session(self):
+        self.client.get(self.article.url)
+        self.assertEqual(self.client.session['read_articles'], {self.article.pk})
+
+        request = self.client.get(self.article.url).wsgi_request
+        self.assertFalse(request.session.modified)
@@ -1,12 +1,21 @@
 from django.contrib.auth import get_user_model
+from django.db.models import OuterRef, Subquery
 from wagtail.contrib.modeladmin.options import ModelAdmin, modeladmin_register
+from wagtail.contrib.modeladmin.views import IndexView
 
+from home.mixins import ChunkedExportMixin
 from home.models import SiteSettings
 from iogt_users.filters import GroupsFilter
+from questionnaires.models import UserSubmission
+
+
+class UsersExportIndexView(ChunkedExportMixin, IndexView):
+    pass
 
 
 class UsersExportAdmin(ModelAdmin):
     model = get_user_model()
+    index_view_class = UsersExportIndexView
     menu_label = 'Export/Import Users'
     menu_icon = 'user'
     list_display = ('username', 'date_joined', 'is_staff', 'is_active')
@@ -19,11 +28,18 @@ class UsersExportAdmin(ModelAdmin):
     list_per_page = 20
     menu_order = 601
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        registration_survey_id = SiteSettings.get_for_default_site().registration_survey_id
+        if registration_survey_id:
+            latest_submission = UserSubmission.objects.filter(
+                user=OuterRef('pk'), page_id=registration_survey_id).order_by('-submit_time')
+            queryset = queryset.annotate(
+                latest_registration_survey_response=Subquery(latest_submission.values('form_data')[:1]))
+        return queryset
+
     def registration_survey_response(self, obj):
-        site_settings = SiteSettings.get_for_default_site()
-        user_submission = obj.usersubmission_set.filter(
-            page__pk=site_settings.registration_survey.pk).order_by('-submit_time').first()
-        return user_submission.form_data if user_submission else ''
+        return getattr(obj, 'latest_registration_survey_response', None) or ''
 
 
 modeladmin_register(UsersExportAdmin)
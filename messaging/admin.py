@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from django.contrib import admin
 
-from .models import ChatbotChannel, Thread, UserThread, Message, Attachment
+from .models import ChatbotChannel, Thread, UserThread, Message, Attachment, OutboundMessage
 
 
 @admin.register(ChatbotChannel)
@@ -52,3 +52,10 @@ class AttachmentAdmin(admin.ModelAdmin):
         'file',
     )
     list_filter = ('created', 'modified')
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'thread', 'status', 'attempts', 'created_at', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    raw_id_fields = ('thread',)
@@ -5,7 +5,7 @@ from django.core.validators import URLValidator
 from django.utils import timezone
 
 from .models import Message, Thread, UserThread
-from messaging.rapidpro_client import RapidProClient
+from messaging import outbox
 
 User = get_user_model()
 
@@ -69,8 +69,7 @@ class ChatManager:
         if quick_replies is None:
             quick_replies = []
         if not sender.is_rapidpro_bot_user:
-            client = RapidProClient(self.thread)
-            client.send_reply(text)
+            outbox.enqueue(self.thread, text)
 
         self._record_message_in_database(
             sender=sender, rapidpro_message_id=rapidpro_message_id, text=text, quick_replies=quick_replies)
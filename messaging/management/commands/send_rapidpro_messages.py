@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from messaging import outbox
+
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    """
+    Deliver the messages queued for the RapidPro channels, with retries. Runs until
+    stopped, or once with --once. Delivered messages are purged every hour.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Deliver the messages which are due and exit')
+        parser.add_argument('--interval', type=float, default=1, help='Seconds to wait when no message is due')
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        purged_at = 0
+        while True:
+            if time.monotonic() - purged_at >= PURGE_INTERVAL:
+                outbox.purge()
+                purged_at = time.monotonic()
+            sent = outbox.process(batch_size=options['batch_size'])
+            if options['once']:
+                self.stdout.write(self.style.SUCCESS(f'{sent} messages delivered'))
+                return
+            if not sent:
+                time.sleep(options['interval'])
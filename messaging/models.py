@@ -8,6 +8,7 @@ from django.contrib.auth import get_user_model
 from django.core.files import File
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from django_extensions.db.models import TimeStampedModel
 from rest_framework import status
 from wagtail.images.models import Image
@@ -131,3 +132,36 @@ class Attachment(TimeStampedModel):
 
     def __str__(self):
         return f'Attachment #{self.pk}'
+
+
+class OutboundMessage(models.Model):
+    """
+    A message to a RapidPro channel waiting to be delivered by
+    `manage.py send_rapidpro_messages`, see messaging.outbox.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    thread = models.ForeignKey('Thread', related_name='outbound_messages', on_delete=models.CASCADE)
+    text = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f'Outbound message #{self.pk} ({self.status})'
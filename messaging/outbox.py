@@ -0,0 +1,165 @@
+import datetime
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from messaging.models import OutboundMessage
+from messaging.rapidpro_client import RapidProClient
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(thread, text):
+    """
+    Queue the message for the RapidPro channel of the thread when
+    RAPIDPRO_OUTBOX_ENABLED is set, otherwise the message is delivered immediately
+    and delivery errors are raised.
+    :return: the queued message, or None if it was delivered immediately
+    """
+    if not getattr(settings, 'RAPIDPRO_OUTBOX_ENABLED', False):
+        RapidProClient(thread).send_reply(text)
+        return None
+    return OutboundMessage.objects.create(thread=thread, text=text)
+
+
+def get_retry_delay(attempts):
+    """
+    :return: the delay before the next attempt, doubled after every failed attempt
+    """
+    delay = getattr(settings, 'RAPIDPRO_OUTBOX_RETRY_DELAY', 30) * 2 ** (attempts - 1)
+    return datetime.timedelta(seconds=min(delay, getattr(settings, 'RAPIDPRO_OUTBOX_MAX_RETRY_DELAY', 60 * 60)))
+
+
+def _get_lease_until():
+    return timezone.now() + datetime.timedelta(seconds=getattr(settings, 'RAPIDPRO_REQUEST_TIMEOUT', 10) * 3)
+
+
+def _claim(batch_size):
+    """
+    Lease the messages which are due, so that other workers skip them until the
+    lease expires. Messages behind an earlier message of their thread which isn't due
+    yet are left for later, to keep the order of the thread.
+
+    The threads of the claimed messages are locked as well, so that a worker claiming
+    at the same time skips the whole thread rather than the locked messages only, and
+    can't claim a later message of the thread before the earlier ones are leased.
+    """
+    now = timezone.now()
+    held_back = OutboundMessage.objects.filter(
+        thread=OuterRef('thread'), status=OutboundMessage.STATUS_PENDING, pk__lt=OuterRef('pk'),
+        next_attempt_at__gt=now)
+    with transaction.atomic():
+        messages = list(
+            OutboundMessage.objects.select_for_update(skip_locked=True, of=('self', 'thread'))
+            .filter(status=OutboundMessage.STATUS_PENDING, next_attempt_at__lte=now)
+            .exclude(Exists(held_back))
+            .select_related('thread__chatbot')
+            .order_by('id')[:batch_size]
+        )
+        lease_until = _get_lease_until()
+        OutboundMessage.objects.filter(pk__in=[message.pk for message in messages]).update(
+            next_attempt_at=lease_until)
+    for message in messages:
+        message.next_attempt_at = lease_until
+    return messages
+
+
+def _renew_lease(message):
+    """
+    Extend the lease of the message to cover its delivery.
+    :return: False if the lease expired and the message was claimed by another worker
+    """
+    lease_until = _get_lease_until()
+    if not OutboundMessage.objects.filter(pk=message.pk, next_attempt_at=message.next_attempt_at).update(
+            next_attempt_at=lease_until):
+        return False
+    message.next_attempt_at = lease_until
+    return True
+
+
+def _deliver_thread(messages):
+    """
+    Deliver the messages of a thread in order, a failed message holds back the
+    following ones until it is retried. The messages are only updated while this
+    worker holds their lease.
+    :return: the number of messages delivered
+    """
+    for sent, message in enumerate(messages):
+        if not _renew_lease(message):
+            logger.warning(f'The lease of {message} expired before it was delivered')
+            return sent
+        lease = OutboundMessage.objects.filter(pk=message.pk, next_attempt_at=message.next_attempt_at)
+        try:
+            RapidProClient(message.thread).send_reply(message.text).raise_for_status()
+        except Exception as e:
+            attempts = message.attempts + 1
+            if attempts >= getattr(settings, 'RAPIDPRO_OUTBOX_MAX_ATTEMPTS', 8):
+                logger.error(f'Giving up on {message} after {attempts} attempts: {e}')
+                lease.update(attempts=attempts, last_error=str(e), status=OutboundMessage.STATUS_FAILED)
+            else:
+                lease.update(
+                    attempts=attempts, last_error=str(e),
+                    next_attempt_at=timezone.now() + get_retry_delay(attempts))
+            # Release the lease of the following messages, they are held back by this one.
+            # They still hold the lease of the claim.
+            following = messages[sent + 1:]
+            if following:
+                OutboundMessage.objects.filter(
+                    pk__in=[message.pk for message in following], next_attempt_at=following[0].next_attempt_at,
+                ).update(next_attempt_at=timezone.now())
+            return sent
+
+        if not lease.update(attempts=message.attempts + 1, status=OutboundMessage.STATUS_SENT, sent_at=timezone.now()):
+            logger.warning(f'The lease of {message} expired while it was delivered')
+            return sent + 1
+    return len(messages)
+
+
+def process(batch_size=100):
+    """
+    Deliver the messages which are due. The threads are delivered by
+    RAPIDPRO_OUTBOX_WORKERS threads, at most RAPIDPRO_CHANNEL_CONCURRENCY of them
+    for the same channel. The channel limit applies per process: several
+    `send_rapidpro_messages` processes together send up to that many messages
+    per process to a channel at once.
+    :return: the number of messages delivered
+    """
+    threads = defaultdict(list)
+    for message in _claim(batch_size):
+        threads[message.thread_id].append(message)
+
+    workers = getattr(settings, 'RAPIDPRO_OUTBOX_WORKERS', 8)
+    if workers <= 1:
+        return sum(_deliver_thread(messages) for messages in threads.values())
+
+    concurrency = getattr(settings, 'RAPIDPRO_CHANNEL_CONCURRENCY', 4)
+    channel_slots = {
+        chatbot_id: threading.BoundedSemaphore(concurrency)
+        for chatbot_id in {messages[0].thread.chatbot_id for messages in threads.values()}
+    }
+
+    def deliver(messages):
+        try:
+            with channel_slots[messages[0].thread.chatbot_id]:
+                return _deliver_thread(messages)
+        finally:
+            close_old_connections()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(deliver, threads.values()))
+
+
+def purge():
+    """
+    Delete the messages delivered more than RAPIDPRO_OUTBOX_KEEP_SENT_DAYS days ago.
+    :return: the number of deleted messages
+    """
+    sent_before = timezone.now() - datetime.timedelta(days=getattr(settings, 'RAPIDPRO_OUTBOX_KEEP_SENT_DAYS', 7))
+    deleted, _ = OutboundMessage.objects.filter(status=OutboundMessage.STATUS_SENT, sent_at__lt=sent_before).delete()
+    return deleted
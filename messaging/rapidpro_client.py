@@ -1,4 +1,32 @@
+import threading
+
 import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    :return: the requests session shared by the threads of the process, which keeps
+    the connections to the RapidPro servers open between messages. Its pool keeps a
+    connection per outbox worker to each of the RAPIDPRO_CONNECTION_POOLS servers
+    used last.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=getattr(settings, 'RAPIDPRO_CONNECTION_POOLS', 10),
+                    pool_maxsize=getattr(settings, 'RAPIDPRO_OUTBOX_WORKERS', 8))
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
 
 
 class RapidProClient:
@@ -7,8 +35,8 @@ class RapidProClient:
         self.thread = thread
 
     def send_reply(self, text):
-        response = requests.get(url=self.thread.chatbot.request_url, params={
+        response = get_session().get(url=self.thread.chatbot.request_url, params={
             'from': self.thread.uuid,
             'text': text,
-        }, timeout=10)
+        }, timeout=getattr(settings, 'RAPIDPRO_REQUEST_TIMEOUT', 10))
         return response
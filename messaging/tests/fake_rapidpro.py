@@ -0,0 +1,52 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeRapidProServer:
+    """
+    A local RapidPro channel which records the messages it receives and answers
+    with `status`.
+
+        with FakeRapidProServer() as server:
+            ChatbotChannel.objects.create(request_url=server.url, ...)
+    """
+
+    def __init__(self, status=200, delay=0):
+        self.status = status
+        self.delay = delay
+        self.messages = []
+        self._lock = threading.Lock()
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if fake.delay:
+                    threading.Event().wait(fake.delay)
+                query = parse_qs(urlparse(self.path).query)
+                if fake.status == 200:
+                    with fake._lock:
+                        fake.messages.append((query['from'][0], query['text'][0]))
+                self.send_response(fake.status)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'ok')
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_port}/receive'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
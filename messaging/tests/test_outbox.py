@@ -0,0 +1,103 @@
+import datetime
+
+import requests
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from iogt_users.factories import UserFactory
+from messaging import outbox
+from messaging.chat import ChatManager
+from messaging.factories import ThreadFactory
+from messaging.models import OutboundMessage
+from messaging.tests.fake_rapidpro import FakeRapidProServer
+
+
+@override_settings(RAPIDPRO_OUTBOX_ENABLED=True, RAPIDPRO_OUTBOX_WORKERS=1, RAPIDPRO_OUTBOX_MAX_ATTEMPTS=2)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.server = FakeRapidProServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+        self.thread = ThreadFactory(chatbot__request_url=self.server.url)
+        self.chat_manager = ChatManager(self.thread)
+        self.user = UserFactory()
+
+    def test_replies_are_delivered_in_order_by_the_worker(self):
+        self.chat_manager.record_reply('Hi', sender=self.user)
+        self.chat_manager.record_reply('How are you?', sender=self.user)
+        self.assertEqual(self.server.messages, [])
+
+        self.assertEqual(outbox.process(), 2)
+
+        self.assertEqual(self.server.messages, [(str(self.thread.uuid), 'Hi'), (str(self.thread.uuid), 'How are you?')])
+        self.assertFalse(OutboundMessage.objects.exclude(status=OutboundMessage.STATUS_SENT).exists())
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        self.server.status = 500
+        self.chat_manager.record_reply('Hi', sender=self.user)
+        self.chat_manager.record_reply('How are you?', sender=self.user)
+
+        self.assertEqual(outbox.process(), 0)
+        first, second = OutboundMessage.objects.all()
+        self.assertEqual((first.status, first.attempts), (OutboundMessage.STATUS_PENDING, 1))
+        self.assertGreater(first.next_attempt_at, timezone.now() + datetime.timedelta(seconds=20))
+        # Held back by the first message
+        self.assertEqual(outbox.process(), 0)
+        self.assertEqual(OutboundMessage.objects.get(pk=second.pk).attempts, 0)
+
+        self.server.status = 200
+        OutboundMessage.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(outbox.process(), 2)
+        self.assertEqual([text for _, text in self.server.messages], ['Hi', 'How are you?'])
+
+    def test_delivery_is_given_up_after_max_attempts(self):
+        self.server.status = 500
+        self.chat_manager.record_reply('Hi', sender=self.user)
+
+        outbox.process()
+        OutboundMessage.objects.update(next_attempt_at=timezone.now())
+        outbox.process()
+
+        self.assertEqual(OutboundMessage.objects.get().status, OutboundMessage.STATUS_FAILED)
+
+    def test_message_claimed_by_another_worker_is_not_sent_again(self):
+        self.chat_manager.record_reply('Hi', sender=self.user)
+        messages = outbox._claim(batch_size=10)
+        # The lease expired and another worker claimed the message
+        OutboundMessage.objects.update(next_attempt_at=timezone.now() + datetime.timedelta(seconds=30))
+
+        self.assertEqual(outbox._deliver_thread(messages), 0)
+
+        self.assertEqual(self.server.messages, [])
+        self.assertEqual(OutboundMessage.objects.get().status, OutboundMessage.STATUS_PENDING)
+
+    def test_delivered_messages_are_purged(self):
+        self.chat_manager.record_reply('Hi', sender=self.user)
+        outbox.process()
+
+        self.assertEqual(outbox.purge(), 0)
+        OutboundMessage.objects.update(sent_at=timezone.now() - datetime.timedelta(days=8))
+        self.assertEqual(outbox.purge(), 1)
+
+
+@override_settings(RAPIDPRO_OUTBOX_ENABLED=False)
+class DirectDeliveryTests(TestCase):
+    def setUp(self):
+        self.server = FakeRapidProServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+        self.user = UserFactory()
+
+    def test_replies_are_delivered_without_queueing(self):
+        thread = ThreadFactory(chatbot__request_url=self.server.url)
+
+        ChatManager(thread).record_reply('Hi', sender=self.user)
+
+        self.assertEqual(self.server.messages, [(str(thread.uuid), 'Hi')])
+        self.assertFalse(OutboundMessage.objects.exists())
+
+    def test_delivery_errors_are_raised(self):
+        thread = ThreadFactory(chatbot__request_url='http://127.0.0.1:1/receive')
+
+        with self.assertRaises(requests.ConnectionError):
+            ChatManager(thread).record_reply('Hi', sender=self.user)
+        self.assertFalse(OutboundMessage.objects.exists())
@@ -0,0 +1,159 @@
+import json
+
+import datetime
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+from home.utils.caches import is_shared_cache
+
+KEY = 'questionnaire_draft:{}:{}'
+
+
+class DraftTooLarge(Exception):
+    pass
+
+
+def _get_model():
+    return apps.get_model('questionnaires', 'QuestionnaireDraft')
+
+
+class BaseDraftStore:
+    """
+    Keeps the answers of the steps of a multi-step questionnaire until it is submitted,
+    per user or, for anonymous users, per session. Drafts are kept outside of the
+    session so that answering a step doesn't rewrite the session of the user.
+    """
+
+    def __init__(self):
+        self.timeout = getattr(settings, 'QUESTIONNAIRE_DRAFT_TIMEOUT', 60 * 60 * 24)
+        self.max_size = getattr(settings, 'QUESTIONNAIRE_DRAFT_MAX_SIZE', None)
+
+    @staticmethod
+    def get_owner(request, create=False):
+        """
+        :param create: create the session of anonymous users who don't have one yet,
+        only when saving a draft so that viewing a questionnaire doesn't write a session
+        :return: the owner of the drafts of the request, or None for anonymous users
+        without a session
+        """
+        if request.user.is_authenticated:
+            return f'user-{request.user.pk}'
+        if not request.session.session_key:
+            if not create:
+                return None
+            request.session.save()
+        return f'session-{request.session.session_key}'
+
+    def get(self, request, page):
+        raise NotImplementedError
+
+    def update(self, request, page, answers):
+        """
+        Add the answers of a step to the draft.
+        :raise DraftTooLarge: if the draft would be larger than QUESTIONNAIRE_DRAFT_MAX_SIZE
+        """
+        raise NotImplementedError
+
+    def delete(self, request, page):
+        raise NotImplementedError
+
+    def encode(self, draft):
+        """
+        :return: the draft as compact JSON
+        :raise DraftTooLarge: if it is larger than QUESTIONNAIRE_DRAFT_MAX_SIZE
+        """
+        draft = json.dumps(draft, cls=DjangoJSONEncoder, separators=(',', ':'))
+        if self.max_size and len(draft) > self.max_size:
+            raise DraftTooLarge
+        return draft
+
+
+class DatabaseDraftStore(BaseDraftStore):
+    """
+    Keeps the drafts in the QuestionnaireDraft table, as compact JSON which expires
+    QUESTIONNAIRE_DRAFT_TIMEOUT seconds after the last answered step. Run
+    `manage.py delete_expired_questionnaire_drafts` to delete the expired drafts.
+    """
+
+    @staticmethod
+    def get_drafts(owner, page):
+        return _get_model().objects.filter(owner=owner, page=page)
+
+    def get(self, request, page):
+        owner = self.get_owner(request)
+        if not owner:
+            return {}
+        draft = self.get_drafts(owner, page).filter(
+            updated_at__gte=timezone.now() - datetime.timedelta(seconds=self.timeout),
+        ).values_list('data', flat=True).first()
+        return json.loads(draft) if draft else {}
+
+    def update(self, request, page, answers):
+        draft = self.get(request, page)
+        draft.update(answers)
+        _get_model().objects.update_or_create(
+            owner=self.get_owner(request, create=True), page=page,
+            defaults={'data': self.encode(draft), 'updated_at': timezone.now()})
+
+    def delete(self, request, page):
+        owner = self.get_owner(request)
+        if owner:
+            self.get_drafts(owner, page).delete()
+
+    def delete_expired(self):
+        """
+        :return: the number of deleted drafts
+        """
+        deleted, _ = _get_model().objects.filter(
+            updated_at__lt=timezone.now() - datetime.timedelta(seconds=self.timeout)).delete()
+        return deleted
+
+
+class CacheDraftStore(BaseDraftStore):
+    """
+    Keeps the drafts in QUESTIONNAIRE_DRAFT_CACHE, as compact JSON which expires
+    QUESTIONNAIRE_DRAFT_TIMEOUT seconds after the last answered step. The cache must
+    be shared by the processes of the website, and shouldn't evict drafts before
+    they expire, otherwise answers of earlier steps are lost.
+    """
+
+    def __init__(self):
+        super().__init__()
+        alias = getattr(settings, 'QUESTIONNAIRE_DRAFT_CACHE', 'default')
+        if not is_shared_cache(alias):
+            raise ImproperlyConfigured(
+                f'CacheDraftStore requires a cache shared by the processes, {alias} is local to each process')
+        self.cache = caches[alias]
+
+    def get_key(self, request, page, create=False):
+        owner = self.get_owner(request, create)
+        return KEY.format(page.pk, owner) if owner else None
+
+    def get(self, request, page):
+        key = self.get_key(request, page)
+        draft = self.cache.get(key) if key else None
+        return json.loads(draft) if draft else {}
+
+    def update(self, request, page, answers):
+        key = self.get_key(request, page, create=True)
+        draft = self.cache.get(key)
+        draft = json.loads(draft) if draft else {}
+        draft.update(answers)
+        self.cache.set(key, self.encode(draft), self.timeout)
+
+    def delete(self, request, page):
+        key = self.get_key(request, page)
+        if key:
+            self.cache.delete(key)
+
+
+draft_store = SimpleLazyObject(
+    lambda: import_string(getattr(settings, 'QUESTIONNAIRE_DRAFT_STORE', 'questionnaires.drafts.DatabaseDraftStore'))()
+)
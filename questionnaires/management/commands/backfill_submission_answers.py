@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from questionnaires.models import SubmissionAnswer, UserSubmission
+
+
+class Command(BaseCommand):
+    """
+    This command writes the answers of the submissions made before answers were
+    stored per question. Submissions which already have answers are skipped, so it
+    can be interrupted and run again.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('page_ids', nargs='*', type=int, help='Only backfill the submissions of these pages')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        submissions = UserSubmission.objects.all()
+        if options['page_ids']:
+            submissions = submissions.filter(page_id__in=options['page_ids'])
+
+        count = SubmissionAnswer.backfill(submissions, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully backfilled the answers of {count} submissions'))
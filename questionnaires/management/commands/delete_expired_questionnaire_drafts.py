@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from questionnaires.drafts import DatabaseDraftStore
+
+
+class Command(BaseCommand):
+    """
+    This command deletes the drafts of multi-step questionnaires kept by
+    DatabaseDraftStore whose last step was answered more than
+    QUESTIONNAIRE_DRAFT_TIMEOUT seconds ago.
+    """
+
+    def handle(self, *args, **options):
+        deleted = DatabaseDraftStore().delete_expired()
+        self.stdout.write(self.style.SUCCESS(f'Successfully deleted {deleted} expired drafts'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from questionnaires.models import Poll, PollAnswerCount
+
+
+class Command(BaseCommand):
+    """
+    This command recounts the poll results from the existing submissions.
+    Run it after editing the questions of a poll that already has submissions.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('poll_ids', nargs='*', type=int, help='Only rebuild the results of these polls')
+
+    def handle(self, *args, **options):
+        polls = Poll.objects.all()
+        if options['poll_ids']:
+            polls = polls.filter(pk__in=options['poll_ids'])
+
+        for poll in polls:
+            PollAnswerCount.rebuild(poll)
+            self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt results for {poll}'))
@@ -0,0 +1,32 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from questionnaires import rollups
+from questionnaires.models import Poll, Quiz, Survey
+
+
+class Command(BaseCommand):
+    """
+    This command recounts the daily submissions and answers of the questionnaires
+    from their submissions. Run it to catch up with the submissions made before the
+    daily counts existed or after they were edited.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('page_ids', nargs='*', type=int, help='Only rebuild the counts of these questionnaires')
+        parser.add_argument('--days', type=int, help='Only rebuild the counts of the last DAYS days')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['days']:
+            since = timezone.localdate() - datetime.timedelta(days=options['days'] - 1)
+
+        for model in (Poll, Quiz, Survey):
+            pages = model.objects.all()
+            if options['page_ids']:
+                pages = pages.filter(pk__in=options['page_ids'])
+            for page in pages:
+                rollups.rebuild([page.pk], since=since)
+                self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt daily counts for {page}'))
@@ -0,0 +1,55 @@
+# Generated by Django 3.1.14 on 2026-10-18 04:12
+
+import json
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def count_existing_answers(apps, schema_editor):
+    Poll = apps.get_model('questionnaires', 'Poll')
+    PollAnswerCount = apps.get_model('questionnaires', 'PollAnswerCount')
+    UserSubmission = apps.get_model('questionnaires', 'UserSubmission')
+
+    for poll in Poll.objects.all():
+        field_names = list(poll.poll_form_fields.values_list('clean_name', flat=True))
+        counts = {}
+        for form_data in UserSubmission.objects.filter(page_id=poll.pk).order_by('id').values_list(
+                'form_data', flat=True).iterator():
+            data = json.loads(form_data)
+            for field_name in field_names:
+                answer = data.get(field_name)
+                if answer is None:
+                    continue
+                answer = u', '.join(answer) if type(answer) is list else str(answer)
+                counts[(field_name, answer)] = counts.get((field_name, answer), 0) + 1
+
+        PollAnswerCount.objects.bulk_create([
+            PollAnswerCount(page_id=poll.pk, field_name=field_name, answer=answer, count=count)
+            for (field_name, answer), count in counts.items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionnaires', '0002_auto_20210719_1820'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollAnswerCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_name', models.CharField(max_length=255)),
+                ('answer', models.TextField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_counts', to='questionnaires.poll')),
+            ],
+            options={
+                'ordering': ('id',),
+                'unique_together': {('page', 'field_name', 'answer')},
+            },
+        ),
+        migrations.RunPython(count_existing_answers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.1.14 on 2026-10-18 04:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('wagtailcore', '0059_apply_collection_ordering'),
+        ('questionnaires', '0003_pollanswercount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionAnswer',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_name', models.CharField(max_length=255)),
+                ('value', models.TextField()),
+                ('submit_time', models.DateTimeField()),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.page')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='questionnaires.usersubmission')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='submissionanswer',
+            index=models.Index(fields=['page', 'field_name'], name='questionnai_page_id_d128a5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submissionanswer',
+            index=models.Index(fields=['page', 'submit_time'], name='questionnai_page_id_4bd0ad_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.1.14 on 2026-10-18 05:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0059_apply_collection_ordering'),
+        ('questionnaires', '0004_submissionanswer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionnaireDailySubmissions',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.page')),
+            ],
+            options={
+                'ordering': ('date',),
+                'unique_together': {('page', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionnaireDailyAnswers',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_name', models.CharField(max_length=255)),
+                ('value', models.TextField()),
+                ('date', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.page')),
+            ],
+            options={
+                'ordering': ('date',),
+                'unique_together': {('page', 'field_name', 'value', 'date')},
+            },
+        ),
+    ]
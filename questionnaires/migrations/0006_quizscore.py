@@ -0,0 +1,33 @@
+# Generated by Django 3.1.14 on 2026-10-18 05:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0059_apply_collection_ordering'),
+        ('questionnaires', '0005_questionnaire_daily_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submissionanswer',
+            name='is_correct',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='QuizScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField()),
+                ('total_correct', models.PositiveIntegerField()),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.page')),
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_score', to='questionnaires.usersubmission')),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+    ]
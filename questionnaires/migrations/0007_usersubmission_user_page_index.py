@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-18 05:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionnaires', '0006_quizscore'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usersubmission',
+            index=models.Index(fields=['user', 'page'], name='questionnai_user_id_256a5f_idx'),
+        ),
+    ]
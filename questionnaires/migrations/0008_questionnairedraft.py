@@ -0,0 +1,28 @@
+# Generated by Django 3.1.14 on 2026-10-18 05:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0059_apply_collection_ordering'),
+        ('questionnaires', '0007_usersubmission_user_page_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionnaireDraft',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=64)),
+                ('data', models.TextField()),
+                ('updated_at', models.DateTimeField(db_index=True)),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.page')),
+            ],
+            options={
+                'unique_together': {('owner', 'page')},
+            },
+        ),
+    ]
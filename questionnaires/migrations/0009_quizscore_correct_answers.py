@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-18 05:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionnaires', '0008_questionnairedraft'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizscore',
+            name='correct_answers',
+            field=models.JSONField(default=dict),
+        ),
+    ]
@@ -6,12 +6,16 @@ from django.utils.functional import cached_property
 
 from django.core.paginator import EmptyPage, PageNotAnInteger
 from django.core.serializers.json import DjangoJSONEncoder
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.shortcuts import render
 from django.utils.translation import gettext_lazy as _
 from wagtail_localize.fields import TranslatableField
 
 from home.blocks import MediaBlock
+from home.utils.counters import add_to_counter
 from home.mixins import PageUtilsMixin
 from iogt_users.models import User
 from modelcluster.fields import ParentalKey
@@ -23,11 +27,22 @@ from wagtail.contrib.forms.models import (AbstractForm, AbstractFormField,
 from wagtail.core import blocks
 from wagtail.core.fields import StreamField
 from wagtail.core.models import Page
+from wagtail.core.signals import page_published
 from wagtail.images.blocks import ImageChooserBlock
 
+from questionnaires import rollups, submitted
 from questionnaires.blocks import SkipLogicField, SkipState
+from questionnaires.drafts import DraftTooLarge, draft_store
 from questionnaires.forms import SurveyForm, QuizForm
-from questionnaires.utils import SkipLogicPaginator
+from questionnaires.utils import LRUCache, QuizAnswerKey, SkipLogicGraph, SkipLogicPaginator
+
+
+# Form fields, form classes, compiled skip logic and quiz answer keys of the most
+# recently used page revisions
+form_fields_cache = LRUCache(maxsize=256)
+form_classes = LRUCache(maxsize=1024)
+skip_logic_graphs = LRUCache(maxsize=256)
+quiz_answer_keys = LRUCache(maxsize=256)
 
 
 class QuestionnairePage(Page, PageUtilsMixin):
@@ -76,13 +91,45 @@ class QuestionnairePage(Page, PageUtilsMixin):
     def __str__(self):
         return self.title
 
+    def get_submissions_list_view_class(self):
+        from questionnaires.views import QuestionnaireSubmissionsListView
+        return QuestionnaireSubmissionsListView
+
+    # The name of the relation of the form fields
+    form_fields_relation_name = None
+
+    def get_for_live_revision(self, lru_cache, compile, *key):
+        """
+        :return: compile() for the live revision, compiled once per process and key.
+        Previews are compiled from the previewed revision every time.
+        """
+        if not self.live_revision_id or getattr(self, '_is_preview', False):
+            return compile()
+        return lru_cache.get_or_set((self.pk, self.live_revision_id, *key), compile)
+
+    def serve_preview(self, request, mode_name):
+        self._is_preview = True
+        return super().serve_preview(request, mode_name)
+
+    def get_form_fields(self):
+        return self.get_for_live_revision(
+            form_fields_cache, lambda: tuple(getattr(self, self.form_fields_relation_name).all()))
+
+    def get_form_class(self):
+        return self.get_for_live_revision(form_classes, lambda: self.form_builder(self.get_form_fields()).get_form_class())
+
+    def get_form_class_for_step(self, step):
+        return self.get_for_live_revision(
+            form_classes,
+            lambda: self.form_builder(step.object_list).get_form_class(),
+            *(field.clean_name for field in step.object_list),
+        )
+
+    def get_skip_logic_graph(self):
+        return self.get_for_live_revision(skip_logic_graphs, lambda: SkipLogicGraph(self.get_form_fields()))
+
     def serve(self, request, *args, **kwargs):
-        if (
-            not self.allow_multiple_submissions
-            and self.get_submission_class()
-            .objects.filter(page=self, user__pk=request.user.pk)
-            .exists()
-        ):
+        if not self.allow_multiple_submissions and submitted.has_submitted(request, self):
             return render(request, self.template, self.get_context(request))
         if hasattr(self, "multi_step") and self.multi_step:
             return self.serve_questions_separately(request)
@@ -90,17 +137,17 @@ class QuestionnairePage(Page, PageUtilsMixin):
         return super().serve(request, *args, **kwargs)
 
     def serve_questions_separately(self, request, *args, **kwargs):
-        session_key_data = "form_data-%s" % self.pk
         is_last_step = False
         step_number = request.GET.get("p", 1)
 
         if step_number == 1:
-            request.session.pop(session_key_data, None)
-
-        form_data = request.session.get(session_key_data, {})
+            draft_store.delete(request, self)
+            form_data = {}
+        else:
+            form_data = draft_store.get(request, self)
 
         paginator = SkipLogicPaginator(
-            self.get_form_fields(),
+            self.get_skip_logic_graph(),
             request.POST,
             form_data,
         )
@@ -133,10 +180,13 @@ class QuestionnairePage(Page, PageUtilsMixin):
                 user=request.user
             )
             if prev_form.is_valid():
-                # If data for step is valid, update the session
-                form_data = request.session.get(session_key_data, {})
+                # If data for step is valid, add it to the draft
+                try:
+                    draft_store.update(request, self, prev_form.cleaned_data)
+                except DraftTooLarge:
+                    prev_form.add_error(None, _("Your answers are too long."))
+            if prev_form.is_valid():
                 form_data.update(prev_form.cleaned_data)
-                request.session[session_key_data] = form_data
 
                 if prev_step.has_next():
                     # Create a new form for a following step, if the following step is present
@@ -145,16 +195,16 @@ class QuestionnairePage(Page, PageUtilsMixin):
                 else:
                     # If there is no next step, create form for all fields
                     form = self.get_form(
-                        request.session[session_key_data],
+                        form_data,
                         page=self, user=request.user
                     )
 
                     if form.is_valid():
                         # Perform validation again for whole form.
                         # After successful validation, save data into DB,
-                        # and remove from the session.
+                        # and remove the draft.
                         form_submission = self.process_form_submission(form)
-                        request.session.pop(session_key_data, None)
+                        draft_store.delete(request, self)
                         # render the landing page
                         return self.render_landing_page(
                             request, form_submission, *args, **kwargs
@@ -176,14 +226,32 @@ class QuestionnairePage(Page, PageUtilsMixin):
         return render(request, self.template, context)
 
     def process_form_submission(self, form):
-        from home.models import SiteSettings
-
         user = form.user
-        self.get_submission_class().objects.create(
-            form_data=json.dumps(form.cleaned_data, cls=DjangoJSONEncoder),
-            page=self,
-            user=None if user.is_anonymous else user,
-        )
+        form_data = json.dumps(form.cleaned_data, cls=DjangoJSONEncoder)
+        with transaction.atomic():
+            form_submission = self.get_submission_class().objects.create(
+                form_data=form_data,
+                page=self,
+                user=None if user.is_anonymous else user,
+            )
+            # Kept for render_landing_page
+            form_submission.decoded_form_data = json.loads(form_data)
+            answers = SubmissionAnswer.from_submission(form_submission, form_submission.decoded_form_data)
+            self.on_submission(form_submission, form_submission.decoded_form_data, answers)
+            SubmissionAnswer.objects.bulk_create(answers)
+            rollups.record(form_submission, answers)
+        return form_submission
+
+    def on_submission(self, form_submission, form_data, answers):
+        """
+        Called when a submission is saved, before its answers are saved.
+        :param form_data: the decoded form_data of the submission
+        """
+
+    def render_landing_page(self, request, form_submission=None, *args, **kwargs):
+        if form_submission:
+            submitted.record(request, self)
+        return super().render_landing_page(request, form_submission, *args, **kwargs)
 
     class Meta:
         abstract = True
@@ -224,6 +292,10 @@ class SurveyFormField(AbstractFormField):
             for logic in self.skip_logic
         )
 
+    @cached_property
+    def choice_list(self):
+        return self.choices.split(',')
+
     def choice_index(self, choice):
         if choice:
             if self.field_type == 'checkbox':
@@ -232,7 +304,7 @@ class SurveyFormField(AbstractFormField):
                     return ['on', 'off'].index(choice)
                 except ValueError:
                     return [True, False].index(choice)
-            return self.choices.split(',').index(choice)
+            return self.choice_list.index(choice)
         else:
             return False
 
@@ -250,6 +322,7 @@ class SurveyFormField(AbstractFormField):
 
 
 class Survey(QuestionnairePage, AbstractForm):
+    form_fields_relation_name = 'survey_form_fields'
     base_form_class = SurveyForm
 
     parent_page_types = ["home.HomePage", "home.Section", "home.Article"]
@@ -306,26 +379,22 @@ class Survey(QuestionnairePage, AbstractForm):
             for field in self.get_form_fields()
         )
 
-    def get_form_class_for_step(self, step):
-        return self.form_builder(step.object_list).get_form_class()
-
-    def get_form_fields(self):
-        return self.survey_form_fields.all()
-
     def get_submission_class(self):
         return UserSubmission
 
     def process_form_submission(self, form):
         from home.models import SiteSettings
 
-        super().process_form_submission(form)
+        form_submission = super().process_form_submission(form)
 
         site_settings = SiteSettings.get_for_default_site()
-        if site_settings.registration_survey and site_settings.registration_survey.pk == self.pk:
+        if site_settings.registration_survey_id == self.pk:
             user = form.user
             user.has_filled_registration_survey = True
             user.save(update_fields=['has_filled_registration_survey'])
 
+        return form_submission
+
     def get_context(self, request, *args, **kwargs):
         context = super().get_context(request, *args, **kwargs)
         context.update({'back_url': request.GET.get('back_url')})
@@ -354,6 +423,12 @@ class UserSubmission(AbstractFormSubmission):
         get_user_model(), on_delete=models.CASCADE, blank=True, null=True
     )
 
+    class Meta(AbstractFormSubmission.Meta):
+        indexes = [
+            # Questionnaires submitted by a user, see questionnaires.submitted
+            models.Index(fields=['user', 'page']),
+        ]
+
     def get_data(self):
         form_data = super().get_data()
         form_data.update(
@@ -365,6 +440,127 @@ class UserSubmission(AbstractFormSubmission):
         return form_data
 
 
+class SubmissionAnswer(models.Model):
+    """
+    The answers of each UserSubmission, one row per question, so that answers can be
+    aggregated in SQL instead of decoding the form_data of every submission. They are
+    written by QuestionnairePage.process_form_submission, run
+    `manage.py backfill_submission_answers` for the submissions made before.
+    """
+    submission = models.ForeignKey(UserSubmission, on_delete=models.CASCADE, related_name='answers')
+    page = models.ForeignKey('wagtailcore.Page', on_delete=models.CASCADE, related_name='+')
+    field_name = models.CharField(max_length=255)
+    value = models.TextField()
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    submit_time = models.DateTimeField()
+    # Whether the answer to a quiz question is correct, None for other questionnaires
+    is_correct = models.BooleanField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [
+            models.Index(fields=['page', 'field_name']),
+            models.Index(fields=['page', 'submit_time']),
+        ]
+
+    def __str__(self):
+        return f'{self.page_id}: {self.field_name}={self.value}'
+
+    @staticmethod
+    def normalize_value(value):
+        if type(value) is list:
+            # Answer is a list if the field type is 'Checkboxes'
+            return u', '.join(str(item) for item in value)
+        return str(value)
+
+    @classmethod
+    def from_submission(cls, submission, form_data):
+        """
+        :param form_data: the decoded form_data of the submission
+        """
+        return [
+            cls(submission_id=submission.pk, page_id=submission.page_id, field_name=field_name,
+                value=cls.normalize_value(value), user_id=submission.user_id,
+                submit_time=submission.submit_time)
+            for field_name, value in form_data.items()
+            if value is not None
+        ]
+
+    @classmethod
+    def backfill(cls, submissions, batch_size=1000):
+        """
+        Write the answers of the submissions which have none yet.
+        :return: the number of submissions backfilled
+        """
+        submissions = submissions.exclude(
+            models.Exists(cls.objects.filter(submission=models.OuterRef('pk')))
+        ).order_by('pk').only('pk', 'page_id', 'user_id', 'submit_time', 'form_data')
+
+        count = 0
+        answers = []
+        for submission in submissions.iterator(chunk_size=batch_size):
+            answers.extend(cls.from_submission(submission, json.loads(submission.form_data)))
+            count += 1
+            if len(answers) >= batch_size:
+                cls.objects.bulk_create(answers, batch_size=batch_size)
+                answers = []
+        cls.objects.bulk_create(answers, batch_size=batch_size)
+        return count
+
+
+class QuestionnaireDraft(models.Model):
+    """
+    The answers to the steps of a multi-step questionnaire so far, see
+    questionnaires.drafts.DatabaseDraftStore.
+    """
+    # user-<id>, or session-<session key> for anonymous users
+    owner = models.CharField(max_length=64)
+    page = models.ForeignKey('wagtailcore.Page', on_delete=models.CASCADE, related_name='+')
+    data = models.TextField()
+    updated_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('owner', 'page')
+
+    def __str__(self):
+        return f'{self.owner}: {self.page_id}'
+
+
+class QuestionnaireDailySubmissions(models.Model):
+    """
+    Number of submissions per questionnaire and day, see questionnaires.rollups.
+    """
+    page = models.ForeignKey('wagtailcore.Page', on_delete=models.CASCADE, related_name='+')
+    date = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ('date',)
+        unique_together = ('page', 'date')
+
+    def __str__(self):
+        return f'{self.page_id} on {self.date}: {self.count}'
+
+
+class QuestionnaireDailyAnswers(models.Model):
+    """
+    Number of answers per questionnaire, question, answer and day, see
+    questionnaires.rollups.
+    """
+    page = models.ForeignKey('wagtailcore.Page', on_delete=models.CASCADE, related_name='+')
+    field_name = models.CharField(max_length=255)
+    value = models.TextField()
+    date = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ('date',)
+        unique_together = ('page', 'field_name', 'value', 'date')
+
+    def __str__(self):
+        return f'{self.page_id}: {self.field_name}={self.value} on {self.date}: {self.count}'
+
+
 class PollFormField(AbstractFormField):
     page = ParentalKey("Poll", on_delete=models.CASCADE, related_name="poll_form_fields")
     CHOICES = (
@@ -381,6 +577,7 @@ class PollFormField(AbstractFormField):
 
 
 class Poll(QuestionnairePage, AbstractForm):
+    form_fields_relation_name = 'poll_form_fields'
     template = "poll/poll.html"
     parent_page_types = ["home.HomePage", "home.Section", "home.Article"]
 
@@ -438,63 +635,53 @@ class Poll(QuestionnairePage, AbstractForm):
         verbose_name = _("poll")
         verbose_name_plural = _("polls")
 
-    def get_form_fields(self):
-        return self.poll_form_fields.all()
-
     def get_submission_class(self):
         return UserSubmission
 
     def serve(self, request, *args, **kwargs):
-        if (
-            not self.allow_multiple_submissions
-            and self.get_submission_class()
-            .objects.filter(page=self, user__pk=request.user.pk)
-            .exists()
-        ):
+        if not self.allow_multiple_submissions and submitted.has_submitted(request, self):
             return render(request, self.template, self.get_context(request))
 
         return super().serve(request, *args, **kwargs)
 
-    def get_context(self, request, *args, **kwargs):
-        context = super().get_context(request, *args, **kwargs)
+    def process_form_submission(self, form):
+        with transaction.atomic():
+            form_submission = super().process_form_submission(form)
+            for field in self.get_form_fields():
+                answer = form.cleaned_data.get(field.clean_name)
+                if answer is not None:
+                    PollAnswerCount.increment(self, field.clean_name, answer)
+
+        return form_submission
+
+    def get_results(self):
+        """
+        Read the poll results from the PollAnswerCount table.
+        :return: {question label: {answer: count or percentage}}
+        """
+        labels = {
+            field.clean_name: field.label
+            for field in self.get_form_fields()
+        }
+
         results = dict()
+        for answer_count in self.answer_counts.filter(field_name__in=labels):
+            results.setdefault(labels[answer_count.field_name], {})[answer_count.answer] = answer_count.count
 
-        # Get information about form fields
-        data_fields = [
-            (field.clean_name, field.label)
-            for field in self.get_form_fields()
-        ]
+        if self.result_as_percentage and results:
+            # Percentages of all the submissions, including the ones which didn't answer
+            # the question, e.g. made before it was added
+            total_submissions = self.get_submission_class().objects.filter(page=self).count()
+            for question_stats in results.values():
+                for answer, count in question_stats.items():
+                    question_stats[answer] = round(count / total_submissions, 4) * 100
 
-        submissions = self.get_submission_class().objects.filter(page=self)
-        for submission in submissions:
-            data = submission.get_data()
-
-            # Count results for each question
-            for name, label in data_fields:
-                answer = data.get(name)
-                if answer is None:
-                    # Something wrong with data.
-                    # Probably you have changed questions
-                    # and now we are receiving answers for old questions.
-                    # Just skip them.
-                    continue
-
-                if type(answer) is list:
-                    # Answer is a list if the field type is 'Checkboxes'
-                    answer = u', '.join(answer)
-
-                question_stats = results.get(label, {})
-                question_stats[answer] = question_stats.get(answer, 0) + 1
-                results[label] = question_stats
-
-        if self.result_as_percentage:
-            total_submissions = len(submissions)
-            for key in results:
-                for k,v in results[key].items():
-                    results[key][k] = round(v/total_submissions, 4) * 100
+        return results
 
+    def get_context(self, request, *args, **kwargs):
+        context = super().get_context(request, *args, **kwargs)
         context.update({
-            'results': results,
+            'results': self.get_results(),
             'result_as_percentage': self.result_as_percentage,
             'back_url': request.GET.get('back_url'),
         })
@@ -513,6 +700,52 @@ class Poll(QuestionnairePage, AbstractForm):
         return data_fields
 
 
+class PollAnswerCount(models.Model):
+    """
+    Running count of the submissions per poll, question and answer. It is
+    updated by Poll.process_form_submission so that rendering the results does
+    not have to decode every UserSubmission.
+    """
+    page = models.ForeignKey('Poll', on_delete=models.CASCADE, related_name='answer_counts')
+    field_name = models.CharField(max_length=255)
+    answer = models.TextField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ('id',)
+        unique_together = ('page', 'field_name', 'answer')
+
+    def __str__(self):
+        return f'{self.page}: {self.field_name}={self.answer} ({self.count})'
+
+    @staticmethod
+    def normalize_answer(answer):
+        return SubmissionAnswer.normalize_value(answer)
+
+    @classmethod
+    def increment(cls, page, field_name, answer, count=1):
+        answer = cls.normalize_answer(answer)
+        add_to_counter(cls, 'count', count, page=page, field_name=field_name, answer=answer)
+
+    @classmethod
+    def rebuild(cls, poll):
+        """
+        Recount the answers of all the existing submissions of the poll.
+        """
+        SubmissionAnswer.backfill(poll.get_submission_class().objects.filter(page=poll))
+        # Answers for questions which no longer exist are skipped
+        field_names = [field.clean_name for field in poll.get_form_fields()]
+        counts = SubmissionAnswer.objects.filter(page=poll, field_name__in=field_names).values(
+            'field_name', 'value').annotate(count=Count('pk')).order_by()
+
+        with transaction.atomic():
+            cls.objects.filter(page=poll).delete()
+            cls.objects.bulk_create([
+                cls(page=poll, field_name=row['field_name'], answer=row['value'], count=row['count'])
+                for row in counts
+            ])
+
+
 class QuizFormField(AbstractFormField):
     page = ParentalKey("Quiz", on_delete=models.CASCADE, related_name="quiz_form_fields")
     required = models.BooleanField(verbose_name=_('required'), default=True)
@@ -558,6 +791,10 @@ class QuizFormField(AbstractFormField):
             for logic in self.skip_logic
         )
 
+    @cached_property
+    def choice_list(self):
+        return self.choices.split(',')
+
     def choice_index(self, choice):
         if choice:
             if self.field_type == 'checkbox':
@@ -566,7 +803,7 @@ class QuizFormField(AbstractFormField):
                     return ['on', 'off'].index(choice)
                 except ValueError:
                     return [True, False].index(choice)
-            return self.choices.split(',').index(choice)
+            return self.choice_list.index(choice)
         else:
             return False
 
@@ -584,6 +821,7 @@ class QuizFormField(AbstractFormField):
 
 
 class Quiz(QuestionnairePage, AbstractForm):
+    form_fields_relation_name = 'quiz_form_fields'
     base_form_class = QuizForm
 
     parent_page_types = ["home.HomePage", "home.Section", "home.Article"]
@@ -633,12 +871,6 @@ class Quiz(QuestionnairePage, AbstractForm):
             for field in self.get_form_fields()
         )
 
-    def get_form_class_for_step(self, step):
-        return self.form_builder(step.object_list).get_form_class()
-
-    def get_form_fields(self):
-        return self.quiz_form_fields.all()
-
     def get_submission_class(self):
         return UserSubmission
 
@@ -654,43 +886,82 @@ class Quiz(QuestionnairePage, AbstractForm):
         ]
         return data_fields
 
+    def get_answer_key(self):
+        return self.get_for_live_revision(quiz_answer_keys, lambda: QuizAnswerKey(self.get_form_fields()))
+
     def get_context(self, request, *args, **kwargs):
         context = super().get_context(request, *args, **kwargs)
         context.update({'back_url': request.GET.get('back_url')})
         context.update({'form_length': request.GET.get('form_length')})
+        return context
 
-        if request.method == 'POST':
-            form_class = self.get_form_class()
-            form = form_class(data=request.POST, page=self, user=request.user)
-
-            for k, v in form.fields.items():
-                form.fields[k].widget.attrs['readonly'] = True
+    def on_submission(self, form_submission, form_data, answers):
+        answer_key = self.get_answer_key()
+        fields_info, total_correct = answer_key.score(form_data)
+        for answer in answers:
+            if answer.field_name in fields_info:
+                answer.is_correct = fields_info[answer.field_name]['is_correct']
+        QuizScore.objects.create(
+            submission=form_submission, page=self, total=answer_key.total, total_correct=total_correct,
+            correct_answers={name: info['is_correct'] for name, info in fields_info.items()})
+
+    def render_landing_page(self, request, form_submission=None, *args, **kwargs):
+        response = super().render_landing_page(request, form_submission, *args, **kwargs)
+
+        if form_submission:
+            # Show the answers of the whole submission, also for multi-step quizzes
+            form_data = getattr(form_submission, 'decoded_form_data', None) or json.loads(form_submission.form_data)
+            form = self.get_form_class()(data=form_data, page=self, user=request.user)
+            for field in form.fields.values():
+                field.widget.attrs['readonly'] = True
+
+            # Saved by on_submission
+            score = form_submission.quiz_score
+            response.context_data.update({
+                'form': form,
+                'fields_info': self.get_answer_key().get_fields_info(score.correct_answers),
+                'result': {
+                    'total': score.total,
+                    'total_correct': score.total_correct,
+                },
+            })
+
+        return response
 
-            fields_info = {}
+    class Meta:
+        verbose_name = _("quiz")
+        verbose_name_plural = _("quizzes")
 
-            total = 0
-            total_correct = 0
-            for field in self.get_form_fields():
-                # TODO: handle multi-value case
-                is_correct = form.data.get(field.clean_name) == field.correct_answer
-                if is_correct:
-                    total_correct += 1
-                total += 1
-                fields_info[field.clean_name] = {
-                    'feedback': field.feedback,
-                    'correct_answer': field.correct_answer,
-                    'is_correct': is_correct,
-                }
-
-            context['form'] = form
-            context['fields_info'] = fields_info
-            context['result'] = {
-                'total': total,
-                'total_correct': total_correct,
-            }
 
-        return context
+class QuizScore(models.Model):
+    """
+    The score of a quiz submission, see SubmissionAnswer.is_correct for the score of
+    each answer.
+    """
+    submission = models.OneToOneField(UserSubmission, on_delete=models.CASCADE, related_name='quiz_score')
+    page = models.ForeignKey('wagtailcore.Page', on_delete=models.CASCADE, related_name='+')
+    total = models.PositiveIntegerField()
+    total_correct = models.PositiveIntegerField()
+    # {clean name: whether the answer to the question is correct}
+    correct_answers = models.JSONField(default=dict)
 
     class Meta:
-        verbose_name = _("quiz")
-        verbose_name_plural = _("quizzes")
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.submission_id}: {self.total_correct}/{self.total}'
+
+
+@receiver(page_published)
+def compile_skip_logic_graph(sender, instance, **kwargs):
+    if isinstance(instance, QuestionnairePage) and getattr(instance, 'multi_step', False):
+        instance.get_skip_logic_graph()
+    if isinstance(instance, Quiz):
+        instance.get_answer_key()
+
+
+@receiver(post_save, sender=UserSubmission)
+@receiver(post_delete, sender=UserSubmission)
+def invalidate_submitted_questionnaires(sender, instance, **kwargs):
+    if instance.user_id and kwargs.get('created', True):
+        submitted.invalidate(instance.user_id)
@@ -0,0 +1,93 @@
+import datetime
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from home.utils.counters import add_to_counter
+
+
+def _get_models():
+    from questionnaires.models import QuestionnaireDailyAnswers, QuestionnaireDailySubmissions
+    return QuestionnaireDailySubmissions, QuestionnaireDailyAnswers
+
+
+def record(submission, answers):
+    """
+    Add the submission and its answers to the daily counts of the questionnaire.
+    """
+    daily_submissions_model, daily_answers_model = _get_models()
+    date = timezone.localdate(submission.submit_time)
+    add_to_counter(daily_submissions_model, 'count', 1, page_id=submission.page_id, date=date)
+    for answer in answers:
+        add_to_counter(daily_answers_model, 'count', 1, page_id=submission.page_id, field_name=answer.field_name,
+                       value=answer.value, date=date)
+
+
+def rebuild(page_ids, since=None):
+    """
+    Recount the daily counts of the questionnaires from their submissions and answers.
+    :param since: only recount the days from this date on
+    """
+    from questionnaires.models import SubmissionAnswer, UserSubmission
+
+    daily_submissions_model, daily_answers_model = _get_models()
+    submissions = UserSubmission.objects.filter(page_id__in=page_ids)
+    SubmissionAnswer.backfill(submissions)
+    answers = SubmissionAnswer.objects.filter(page_id__in=page_ids)
+    daily_submissions = daily_submissions_model.objects.filter(page_id__in=page_ids)
+    daily_answers = daily_answers_model.objects.filter(page_id__in=page_ids)
+    if since:
+        start = timezone.make_aware(datetime.datetime.combine(since, datetime.time()))
+        submissions = submissions.filter(submit_time__gte=start)
+        answers = answers.filter(submit_time__gte=start)
+        daily_submissions = daily_submissions.filter(date__gte=since)
+        daily_answers = daily_answers.filter(date__gte=since)
+
+    submission_counts = submissions.annotate(date=TruncDate('submit_time')).values(
+        'page_id', 'date').annotate(count=models.Count('pk')).order_by()
+    answer_counts = answers.annotate(date=TruncDate('submit_time')).values(
+        'page_id', 'field_name', 'value', 'date').annotate(count=models.Count('pk')).order_by()
+
+    with transaction.atomic():
+        daily_submissions.delete()
+        daily_answers.delete()
+        daily_submissions_model.objects.bulk_create(
+            [daily_submissions_model(**row) for row in submission_counts.iterator()], batch_size=1000)
+        daily_answers_model.objects.bulk_create(
+            [daily_answers_model(**row) for row in answer_counts.iterator()], batch_size=1000)
+
+
+def get_daily_submissions(page, start, end):
+    """
+    :return: the number of submissions of each day from start to end, both included
+    """
+    daily_submissions_model, _ = _get_models()
+    counts = dict(daily_submissions_model.objects.filter(
+        page=page, date__range=(start, end)).values_list('date', 'count'))
+    return [(start + datetime.timedelta(days=days), counts.get(start + datetime.timedelta(days=days), 0))
+            for days in range((end - start).days + 1)]
+
+
+def get_answer_distribution(page, start, end):
+    """
+    :return: {field name: Counter of the answers} from start to end, both included
+    """
+    _, daily_answers_model = _get_models()
+    distribution = {}
+    rows = daily_answers_model.objects.filter(page=page, date__range=(start, end)).values(
+        'field_name', 'value').annotate(total=models.Sum('count')).order_by()
+    for row in rows:
+        distribution.setdefault(row['field_name'], Counter())[row['value']] += row['total']
+    return distribution
+
+
+def get_total_submissions(page_ids, start, end):
+    """
+    :return: {page id: number of submissions} from start to end, both included
+    """
+    daily_submissions_model, _ = _get_models()
+    return dict(daily_submissions_model.objects.filter(
+        page_id__in=page_ids, date__range=(start, end)).values('page_id').annotate(
+        total=models.Sum('count')).order_by().values_list('page_id', 'total'))
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.cache import cache
+
+KEY = 'submitted_questionnaires:{}'
+SESSION_KEY = 'submitted_questionnaires'
+
+
+def get_submitted_page_ids(request):
+    """
+    :return: the ids of the questionnaires the user of the request has submitted, from
+    the cache for logged in users and from the session for anonymous users. They are
+    looked up once per request.
+    """
+    if not hasattr(request, '_submitted_questionnaire_ids'):
+        user = request.user
+        if user.is_anonymous:
+            page_ids = request.session.get(SESSION_KEY, ())
+        else:
+            key = KEY.format(user.pk)
+            page_ids = cache.get(key)
+            if page_ids is None:
+                from questionnaires.models import UserSubmission
+
+                page_ids = set(UserSubmission.objects.filter(user=user).values_list('page_id', flat=True))
+                cache.set(key, page_ids, getattr(settings, 'SUBMITTED_QUESTIONNAIRES_CACHE_TIMEOUT', 60 * 60 * 24))
+        request._submitted_questionnaire_ids = frozenset(page_ids)
+    return request._submitted_questionnaire_ids
+
+
+def has_submitted(request, page):
+    return page.pk in get_submitted_page_ids(request)
+
+
+def record(request, page):
+    """
+    Add the questionnaire to the questionnaires submitted by the user of the request.
+    The cache of logged in users is invalidated when their submissions are saved.
+    """
+    if request.user.is_anonymous:
+        # A set, stored compactly by iogt.sessions.CompactJSONSerializer
+        request.session[SESSION_KEY] = {*request.session.get(SESSION_KEY, ()), page.pk}
+    if hasattr(request, '_submitted_questionnaire_ids'):
+        request._submitted_questionnaire_ids |= {page.pk}
+
+
+def invalidate(user_id):
+    cache.delete(KEY.format(user_id))
@@ -0,0 +1,352 @@
+import datetime
+import json
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core import management
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from home.models import HomePage
+from iogt_users.factories import UserFactory
+from questionnaires import submitted
+from questionnaires.drafts import CacheDraftStore, DatabaseDraftStore, draft_store
+from questionnaires.models import (Poll, PollAnswerCount, PollFormField, QuestionnaireDailyAnswers,
+                                   QuestionnaireDailySubmissions, QuestionnaireDraft, Quiz, QuizFormField,
+                                   QuizScore, SubmissionAnswer, Survey, SurveyFormField, UserSubmission,
+                                   form_classes, form_fields_cache, quiz_answer_keys, skip_logic_graphs)
+from questionnaires.utils import QuizAnswerKey, SkipLogicPaginator
+
+
+def clear_revision_caches():
+    # Page and revision ids are reused once the test transaction is rolled back
+    for lru_cache in (form_fields_cache, form_classes, skip_logic_graphs, quiz_answer_keys):
+        lru_cache.clear()
+
+
+class PollResultsTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.home_page = HomePage.objects.first()
+        self.poll = Poll(title='poll', result_as_percentage=False)
+        self.poll.poll_form_fields.add(
+            PollFormField(label='Favourite colour', field_type='radio', choices='Red,Blue'))
+        self.home_page.add_child(instance=self.poll)
+
+    def submit(self, answer):
+        form = self.poll.get_form({'favourite_colour': answer}, page=self.poll, user=self.user)
+        self.assertTrue(form.is_valid())
+        return self.poll.process_form_submission(form)
+
+    def test_submission_increments_answer_count(self):
+        self.submit('Red')
+        self.submit('Red')
+        self.submit('Blue')
+
+        self.assertEqual(self.poll.get_results(), {'Favourite colour': {'Red': 2, 'Blue': 1}})
+
+    def test_results_as_percentage(self):
+        self.poll.result_as_percentage = True
+        self.submit('Red')
+        self.submit('Blue')
+
+        self.assertEqual(self.poll.get_results(), {'Favourite colour': {'Red': 50, 'Blue': 50}})
+
+    def test_percentages_are_of_all_submissions(self):
+        self.poll.result_as_percentage = True
+        self.submit('Red')
+        # Made before the question was added
+        UserSubmission.objects.create(page=self.poll, form_data='{}')
+
+        self.assertEqual(self.poll.get_results(), {'Favourite colour': {'Red': 50}})
+
+    def test_rebuild_poll_results_command(self):
+        self.submit('Red')
+        UserSubmission.objects.create(page=self.poll, form_data='{"favourite_colour": "Blue"}')
+        PollAnswerCount.objects.filter(page=self.poll).update(count=10)
+
+        management.call_command('rebuild_poll_results', self.poll.pk, stdout=StringIO())
+
+        self.assertEqual(self.poll.get_results(), {'Favourite colour': {'Red': 1, 'Blue': 1}})
+
+
+class SubmissionAnswerTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.poll = Poll(title='poll')
+        self.poll.poll_form_fields.add(
+            PollFormField(label='Favourite colours', field_type='checkboxes', choices='Red,Blue,Green'))
+        HomePage.objects.first().add_child(instance=self.poll)
+
+    def test_answers_are_written_with_the_submission(self):
+        form = self.poll.get_form({'favourite_colours': ['Red', 'Blue']}, page=self.poll, user=self.user)
+        self.assertTrue(form.is_valid())
+        submission = self.poll.process_form_submission(form)
+
+        answer = SubmissionAnswer.objects.get(submission=submission)
+        self.assertEqual((answer.page_id, answer.field_name, answer.value, answer.user),
+                         (self.poll.pk, 'favourite_colours', 'Red, Blue', self.user))
+
+    def test_backfill_submission_answers_command(self):
+        submission = UserSubmission.objects.create(page=self.poll, form_data='{"favourite_colours": ["Green"]}')
+
+        management.call_command('backfill_submission_answers', stdout=StringIO())
+        management.call_command('backfill_submission_answers', stdout=StringIO())
+
+        self.assertEqual(list(submission.answers.values_list('field_name', 'value')),
+                         [('favourite_colours', 'Green')])
+
+
+class SubmissionsExportTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory(is_superuser=True, is_staff=True)
+        self.poll = Poll(title='poll')
+        self.poll.poll_form_fields.add(
+            PollFormField(label='Favourite colour', field_type='radio', choices='Red,Blue'))
+        HomePage.objects.first().add_child(instance=self.poll)
+        self.client.force_login(self.user)
+
+    def export(self, export_format):
+        response = self.client.get(
+            reverse('wagtailforms:list_submissions', args=[self.poll.pk]), {'export': export_format})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_number_of_queries_does_not_depend_on_number_of_submissions(self):
+        UserSubmission.objects.create(page=self.poll, user=self.user, form_data='{"favourite_colour": "Red"}')
+        self.export('csv')
+        with CaptureQueriesContext(connection) as queries:
+            self.export('csv')
+
+        for _ in range(3):
+            UserSubmission.objects.create(page=self.poll, form_data='{"favourite_colour": "Blue"}')
+        with self.assertNumQueries(len(queries)):
+            rows = self.export('csv')
+
+        self.assertEqual(rows[0], 'User,Submission Date,Page URL,Favourite colour')
+        self.assertEqual(len(rows), 5)
+        self.assertTrue(rows[1].startswith(f'{self.user.username},'))
+        self.assertTrue(rows[1].endswith(f',{self.poll.full_url},Red'))
+
+    def test_json_lines_export(self):
+        UserSubmission.objects.create(page=self.poll, user=self.user, form_data='{"favourite_colour": "Red"}')
+
+        rows = self.export('jsonl')
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(json.loads(rows[0])['favourite_colour'], 'Red')
+
+
+class QuestionnaireRollupTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory(is_superuser=True, is_staff=True)
+        self.poll = Poll(title='poll')
+        self.poll.poll_form_fields.add(
+            PollFormField(label='Favourite colour', field_type='radio', choices='Red,Blue'))
+        HomePage.objects.first().add_child(instance=self.poll)
+
+    def submit(self, answer):
+        form = self.poll.get_form({'favourite_colour': answer}, page=self.poll, user=self.user)
+        self.assertTrue(form.is_valid())
+        return self.poll.process_form_submission(form)
+
+    def test_submissions_are_rolled_up(self):
+        self.submit('Red')
+        self.submit('Red')
+        self.submit('Blue')
+
+        self.assertEqual(QuestionnaireDailySubmissions.objects.get(page=self.poll).count, 3)
+        self.assertEqual(
+            dict(QuestionnaireDailyAnswers.objects.filter(page=self.poll).values_list('value', 'count')),
+            {'Red': 2, 'Blue': 1})
+
+    def test_rebuild_questionnaire_rollups_command(self):
+        self.submit('Red')
+        UserSubmission.objects.create(page=self.poll, form_data='{"favourite_colour": "Blue"}')
+
+        management.call_command('rebuild_questionnaire_rollups', self.poll.pk, days=7, stdout=StringIO())
+
+        self.assertEqual(QuestionnaireDailySubmissions.objects.get(page=self.poll).count, 2)
+        self.assertEqual(
+            dict(QuestionnaireDailyAnswers.objects.filter(page=self.poll).values_list('value', 'count')),
+            {'Red': 1, 'Blue': 1})
+
+    def test_report_does_not_read_submissions(self):
+        self.client.force_login(self.user)
+        self.submit('Red')
+        url = reverse('questionnaire_report', args=[self.poll.pk])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+
+        for _ in range(3):
+            self.submit('Blue')
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url)
+
+        self.assertEqual(response.context['total'], 4)
+        self.assertEqual(response.context['questions'], [('Favourite colour', [('Blue', 3, 75.0), ('Red', 1, 25.0)])])
+        self.assertEqual(self.client.get(reverse('questionnaire_reports')).context['rows'], [(self.poll.page_ptr, 4)])
+
+
+class SkipLogicTests(TestCase):
+    def setUp(self):
+        clear_revision_caches()
+        self.survey = Survey(title='survey', multi_step=True)
+        self.survey.survey_form_fields.add(SurveyFormField(
+            label='Likes colours', field_type='radio', choices='yes,no', sort_order=0, skip_logic=[
+                ('skip_logic', {'choice': 'yes', 'skip_logic': 'next', 'question': None}),
+                ('skip_logic', {'choice': 'no', 'skip_logic': 'question', 'question': 3}),
+            ]))
+        self.survey.survey_form_fields.add(SurveyFormField(label='Favourite colour', field_type='singleline', sort_order=1))
+        self.survey.survey_form_fields.add(SurveyFormField(label='Age', field_type='singleline', sort_order=2))
+        HomePage.objects.first().add_child(instance=self.survey)
+        self.survey.save_revision().publish()
+        self.survey.refresh_from_db()
+
+    def test_answer_skips_to_question(self):
+        graph = self.survey.get_skip_logic_graph()
+
+        with self.assertNumQueries(0):
+            paginator = SkipLogicPaginator(graph, {'likes_colours': 'no'}, {})
+            step = paginator.page(paginator.page(1).next_page_number())
+            self.assertEqual([field.clean_name for field in step.object_list], ['age'])
+
+            paginator = SkipLogicPaginator(graph, {'likes_colours': 'yes'}, {})
+            step = paginator.page(paginator.page(1).next_page_number())
+            self.assertEqual([field.clean_name for field in step.object_list], ['favourite_colour', 'age'])
+
+    def test_graph_is_compiled_once_per_revision(self):
+        graph = self.survey.get_skip_logic_graph()
+        self.assertIs(Survey.objects.get(pk=self.survey.pk).get_skip_logic_graph(), graph)
+
+        self.survey.save_revision().publish()
+        self.survey.refresh_from_db()
+        self.assertIsNot(self.survey.get_skip_logic_graph(), graph)
+
+    def test_steps_are_kept_in_draft_store(self):
+        user = UserFactory()
+        self.client.force_login(user)
+        url = self.survey.url
+
+        self.client.post(f'{url}?p=2', {'likes_colours': 'yes'})
+        request = self.client.get(f'{url}?p=2').wsgi_request
+        self.assertEqual(draft_store.get(request, self.survey), {'likes_colours': 'yes'})
+        self.assertNotIn(f'form_data-{self.survey.pk}', self.client.session.keys())
+
+        self.client.post(f'{url}?p=3', {'favourite_colour': 'red', 'age': '12'})
+        self.assertEqual(json.loads(UserSubmission.objects.get(user=user, page=self.survey).form_data),
+                         {'likes_colours': 'yes', 'favourite_colour': 'red', 'age': '12'})
+        self.assertEqual(draft_store.get(request, self.survey), {})
+
+    def test_expired_drafts_are_ignored_and_deleted(self):
+        self.client.post(f'{self.survey.url}?p=2', {'likes_colours': 'yes'})
+        QuestionnaireDraft.objects.update(updated_at=timezone.now() - datetime.timedelta(days=2))
+
+        request = self.client.get(f'{self.survey.url}?p=2').wsgi_request
+        self.assertEqual(draft_store.get(request, self.survey), {})
+        self.assertEqual(DatabaseDraftStore().delete_expired(), 1)
+
+    def test_cache_draft_store_requires_a_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            CacheDraftStore()
+
+    def test_viewing_anonymously_does_not_create_a_session(self):
+        response = self.client.get(self.survey.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertFalse(Session.objects.exists())
+
+
+class QuizScoreTests(TestCase):
+    def setUp(self):
+        clear_revision_caches()
+        self.user = UserFactory()
+        self.quiz = Quiz(title='quiz')
+        self.quiz.quiz_form_fields.add(QuizFormField(
+            label='Colour', field_type='radio', choices='red,blue', correct_answer='red', admin_label='colour'))
+        self.quiz.quiz_form_fields.add(QuizFormField(
+            label='Fruits', field_type='checkboxes', choices='apple,carrot,pear', correct_answer='apple, pear',
+            admin_label='fruits'))
+        HomePage.objects.first().add_child(instance=self.quiz)
+        self.quiz.save_revision().publish()
+        self.quiz.refresh_from_db()
+
+    def test_submission_is_scored_and_persisted(self):
+        self.client.force_login(self.user)
+
+        response = self.client.post(self.quiz.url, {'colour': 'blue', 'fruits': ['pear', 'apple']})
+
+        self.assertEqual(response.context['result'], {'total': 2, 'total_correct': 1})
+        self.assertEqual(
+            {name: info['is_correct'] for name, info in response.context['fields_info'].items()},
+            {'colour': False, 'fruits': True})
+        score = QuizScore.objects.get(submission__user=self.user)
+        self.assertEqual((score.total, score.total_correct), (2, 1))
+        self.assertEqual(score.correct_answers, {'colour': False, 'fruits': True})
+        self.assertEqual(
+            dict(SubmissionAnswer.objects.filter(page=self.quiz).values_list('field_name', 'is_correct')),
+            {'colour': False, 'fruits': True})
+
+    def test_landing_page_uses_the_stored_score(self):
+        self.client.force_login(self.user)
+
+        with mock.patch.object(QuizAnswerKey, 'score', wraps=self.quiz.get_answer_key().score) as score:
+            self.client.post(self.quiz.url, {'colour': 'red', 'fruits': ['pear']})
+
+        self.assertEqual(score.call_count, 1)
+
+    def test_answer_key_is_compiled_once_per_revision(self):
+        answer_key = self.quiz.get_answer_key()
+        quiz = Quiz.objects.get(pk=self.quiz.pk)
+
+        with self.assertNumQueries(0):
+            self.assertIs(quiz.get_answer_key(), answer_key)
+
+    def test_form_classes_are_built_once_per_revision(self):
+        form_class = self.quiz.get_form_class()
+        quiz = Quiz.objects.get(pk=self.quiz.pk)
+
+        with self.assertNumQueries(0):
+            self.assertIs(quiz.get_form_class(), form_class)
+            self.assertEqual(list(quiz.get_form().fields), ['colour', 'fruits'])
+
+
+class SubmittedQuestionnairesTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.home_page = HomePage.objects.first()
+        self.poll = Poll(title='poll')
+        self.poll.poll_form_fields.add(PollFormField(label='Favourite colour', field_type='radio', choices='Red,Blue'))
+        self.home_page.add_child(instance=self.poll)
+
+    def get_request(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        return request
+
+    def test_submitted_questionnaires_are_looked_up_once(self):
+        other_poll = Poll(title='other poll')
+        self.home_page.add_child(instance=other_poll)
+
+        request = self.get_request()
+        with self.assertNumQueries(1):
+            self.assertFalse(submitted.has_submitted(request, self.poll))
+            self.assertFalse(submitted.has_submitted(request, other_poll))
+
+        form = self.poll.get_form({'favourite_colour': 'Red'}, page=self.poll, user=self.user)
+        self.assertTrue(form.is_valid())
+        self.poll.process_form_submission(form)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(submitted.has_submitted(self.get_request(), self.poll))
+        with self.assertNumQueries(0):
+            self.assertTrue(submitted.has_submitted(self.get_request(), self.poll))
+            self.assertFalse(submitted.has_submitted(self.get_request(), other_poll))
@@ -1,122 +1,282 @@
 from __future__ import unicode_literals
 
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+
 from django.core.paginator import Page, Paginator
+from django.utils.functional import cached_property
 
 from .blocks import SkipState
 
 
-class SkipLogicPaginator(Paginator):
-    def __init__(self, object_list, new_answers=dict, previous_answers=dict):
-        self.new_answers = new_answers.copy()
-        self.previous_answers = previous_answers
-
-        super().__init__(object_list, per_page=1)
-
-        self.question_labels = [
-            question.clean_name for question in self.object_list
+class LRUCache:
+    """
+    Per process cache of the most recently used values, e.g. values compiled per page
+    revision which are not worth a round trip to the shared cache.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key, default):
+        """
+        :param default: callable computing the value if it isn't cached
+        """
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                return self._values[key]
+
+        value = default()
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class SkipLogicGraph:
+    """
+    The questions of a questionnaire compiled into lookup tables: the index of each
+    question, where each choice leads to and the page breaks. It is read only, so the
+    graph of a page revision can be shared by every request.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.index = {}
+        sort_order_index = {}
+        for index, field in enumerate(self.fields):
+            self.index.setdefault(field.clean_name, index)
+            sort_order_index.setdefault(field.sort_order, index)
+        self.transitions = tuple(self._compile_transitions(field, sort_order_index) for field in self.fields)
+
+        num_questions = len(self.fields)
+        page_breaks = [
+            i + 1 for i, field in enumerate(self.fields)
+            if self.transitions[i] is not None or field.page_break
         ]
-
-        self.page_breaks = [
-            i + 1 for i, field in enumerate(self.object_list)
-            if field.has_skipping or field.page_break
-        ]
-
-        num_questions = self.object_list.count()
-
-        if self.page_breaks:
+        if page_breaks:
             # Always have a break at start to create first page
-            self.page_breaks.insert(0, 0)
-            if self.page_breaks[-1] != num_questions:
+            page_breaks.insert(0, 0)
+            if page_breaks[-1] != num_questions:
                 # Must break for last page
-                self.page_breaks.append(num_questions)
+                page_breaks.append(num_questions)
         else:
             # display one question per page
-            self.page_breaks = list(range(num_questions + 1))
+            page_breaks = list(range(num_questions + 1))
+        self.page_breaks = tuple(page_breaks)
+        # Number of page breaks up to each question index, i.e. the page of the question
+        self.page_numbers = tuple(bisect_right(self.page_breaks, i) for i in range(num_questions + 1))
+
+    @staticmethod
+    def _compile_transitions(field, sort_order_index):
+        """
+        :return: the index of each choice and the (action, index of the target question)
+        of each choice, or None if the question doesn't skip
+        """
+        logic = [block.value for block in field.skip_logic]
+        if not any(value['skip_logic'] != SkipState.NEXT for value in logic):
+            return None
+
+        if field.field_type == 'checkbox':
+            # clean checkboxes have True/False
+            choices = {'on': 0, 'off': 1, True: 0, False: 1}
+        else:
+            choices = {}
+            for index, choice in enumerate(field.choices.split(',')):
+                choices.setdefault(choice, index)
+
+        targets = []
+        for value in logic:
+            target = None
+            if value['skip_logic'] == SkipState.QUESTION and value['question'] is not None:
+                # Sorted or is 0 based in the backend and 1 on the front
+                target = sort_order_index.get(value['question'] - 1)
+            targets.append((value['skip_logic'], target))
+        return choices, tuple(targets)
 
-    def _get_page(self, *args, **kwargs):
-        return SkipLogicPage(*args, **kwargs)
+    @property
+    def num_questions(self):
+        return len(self.fields)
 
     @property
     def num_pages(self):
         return len(self.page_breaks) - 1
 
+    def get_transition(self, index, choice):
+        """
+        :return: the (action, index of the target question) of the choice, or None if
+        the question doesn't skip
+        """
+        transitions = self.transitions[index]
+        if transitions is None:
+            return None
+
+        choices, targets = transitions
+        try:
+            return targets[choices[choice] if choice else 0]
+        except (KeyError, TypeError, IndexError):
+            raise ValueError(f'{choice!r} has no skip logic in {self.fields[index].clean_name}')
+
+    def is_next_action(self, index, choice, *actions):
+        transition = self.get_transition(index, choice)
+        return transition is not None and transition[0] in actions
+
+    def next_question_index(self, index, data):
+        transition = self.get_transition(index, data.get(self.fields[index].clean_name))
+        if transition is not None and transition[0] == SkipState.QUESTION:
+            if transition[1] is None:
+                raise ValueError(f'The question {self.fields[index].clean_name} skips to a missing question')
+            return transition[1]
+        return index + 1
+
+
+class QuizAnswerKey:
+    """
+    The correct answers of a quiz normalized once, so that a submission is scored in
+    a single pass over its answers. Checkboxes and multiselect answers are correct if
+    they have exactly the comma separated correct answers. It is read only, so the
+    answer key of a page revision can be shared by every request.
+    """
+    MULTI_VALUE_FIELD_TYPES = ('checkboxes', 'multiselect')
+    CHECKED_VALUES = ('on', 'true', 'yes', '1')
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        # {clean name: (field type, normalized correct answer, correct answer, feedback)}
+        self.answers = {
+            field.clean_name: (
+                field.field_type,
+                self.normalize(field.field_type, field.correct_answer),
+                field.correct_answer,
+                field.feedback,
+            )
+            for field in self.fields
+        }
+
+    @classmethod
+    def normalize(cls, field_type, value):
+        if field_type in cls.MULTI_VALUE_FIELD_TYPES:
+            if isinstance(value, str):
+                value = value.split(',')
+            return frozenset(str(item).strip() for item in value or ())
+        if field_type == 'checkbox':
+            # clean checkboxes have True/False
+            return value is True or str(value).strip().lower() in cls.CHECKED_VALUES
+        return '' if value is None else str(value).strip()
+
+    def score(self, data):
+        """
+        :param data: the answers, e.g. the decoded form_data of a submission
+        :return: the feedback, correct answer and whether the answer is correct of each
+        question, and the number of correct answers
+        """
+        correct_answers = {
+            clean_name: self.normalize(field_type, data.get(clean_name)) == correct
+            for clean_name, (field_type, correct, _, _) in self.answers.items()
+        }
+        return self.get_fields_info(correct_answers), sum(correct_answers.values())
+
+    def get_fields_info(self, correct_answers):
+        """
+        :param correct_answers: whether the answer to each question is correct, e.g.
+        QuizScore.correct_answers
+        :return: the feedback, correct answer and whether the answer is correct of each
+        question
+        """
+        return {
+            clean_name: {
+                'feedback': feedback,
+                'correct_answer': correct_answer,
+                'is_correct': correct_answers.get(clean_name, False),
+            }
+            for clean_name, (_, _, correct_answer, feedback) in self.answers.items()
+        }
+
     @property
+    def total(self):
+        return len(self.answers)
+
+
+class SkipLogicPaginator(Paginator):
+    """
+    Pages through the questions of a questionnaire following their skip logic.
+    :param object_list: the SkipLogicGraph of the questionnaire, or its form fields
+    """
+
+    def __init__(self, object_list, new_answers=dict, previous_answers=dict):
+        self.graph = object_list if isinstance(object_list, SkipLogicGraph) else SkipLogicGraph(object_list)
+        self.new_answers = new_answers.copy()
+        self.previous_answers = previous_answers
+
+        super().__init__(self.graph.fields, per_page=1)
+
+        self.page_breaks = self.graph.page_breaks
+
+    def _get_page(self, *args, **kwargs):
+        return SkipLogicPage(*args, **kwargs)
+
+    @cached_property
+    def count(self):
+        return self.graph.num_questions
+
+    @cached_property
+    def num_pages(self):
+        return self.graph.num_pages
+
+    @cached_property
     def last_question_index(self):
         return self.page_breaks[self.current_page] - 1
 
-    @property
+    @cached_property
     def current_page(self):
-        # search backwards to ensure we find correct lower bound
-        reversed_breaks = reversed(self.page_breaks)
-        page_break = next(
-            index for index in reversed_breaks
-            if index <= self.first_question_index
-        )
-        return self.page_breaks.index(page_break) + 1
+        return self.graph.page_numbers[self.first_question_index]
 
-    @property
+    @cached_property
     def first_question_index(self):
         last_answer = self.last_question_previous_page
         if last_answer >= 0:
-            return self.next_question_from_previous_index(
-                last_answer, self.previous_answers)
+            return self.graph.next_question_index(last_answer, self.previous_answers)
         return 0
 
-    @property
+    @cached_property
     def last_question_previous_page(self):
-        previous_answers_indexes = self.index_of_questions(
-            self.previous_answers)
-        try:
-            return max(previous_answers_indexes)
-        except ValueError:
-            # There have been no previous questions, its the first page
-            return -1
+        previous_answers_indexes = self.index_of_questions(self.previous_answers)
+        # -1 if there have been no previous questions, its the first page
+        return max(previous_answers_indexes, default=-1)
 
     def next_question_from_previous_index(self, index, data):
-        last_question = self.object_list[index]
-        last_answer = data.get(last_question.clean_name)
-        if last_question.is_next_action(last_answer, SkipState.QUESTION):
-            # Sorted or is 0 based in the backend and 1 on the front
-            next_question_id = last_question.next_page(last_answer) - 1
-            question_ids = [
-                question.sort_order for question in self.object_list
-            ]
-            return question_ids.index(next_question_id)
+        return self.graph.next_question_index(index, data)
 
-        return index + 1
-
-    @property
+    @cached_property
     def next_question_index(self):
         if self.new_answers:
-            return self.next_question_from_previous_index(
-                self.last_question_index,
-                self.new_answers,
-            )
+            return self.graph.next_question_index(self.last_question_index, self.new_answers)
         return 0
 
-    @property
+    @cached_property
     def next_page(self):
-        try:
-            return next(
-                page for page, break_index in enumerate(self.page_breaks)
-                if break_index > self.next_question_index
-            )
-        except StopIteration:
-            return self.num_pages
+        return min(self.graph.page_numbers[min(self.next_question_index, self.graph.num_questions)], self.num_pages)
 
-    @property
+    @cached_property
     def previous_page(self):
         # Prevent returning 0 if on the first page
-        return max(1, next(
-            page for page, break_index in enumerate(self.page_breaks)
-            if break_index > self.last_question_previous_page
-        ))
+        if self.last_question_previous_page < 0:
+            return 1
+        return max(1, self.graph.page_numbers[self.last_question_previous_page])
 
     def index_of_questions(self, data):
-        return [
-            self.question_labels.index(question) for question in data
-            if question in self.question_labels
-        ]
+        index = self.graph.index
+        return [index[question] for question in data if question in index]
 
     @property
     def missing_checkboxes(self):
@@ -148,7 +308,7 @@ class SkipLogicPaginator(Paginator):
             top_index = index + self.per_page
             top = self.page_breaks[top_index]
 
-        return self._get_page(self.object_list[bottom:top], index + 1, self)
+        return self._get_page(list(self.object_list[bottom:top]), index + 1, self)
 
 
 class SkipLogicPage(Page):
@@ -168,7 +328,8 @@ class SkipLogicPage(Page):
             question_response = self.last_response
         except KeyError:
             return False
-        return self.last_question.is_next_action(question_response, *actions)
+        graph = self.paginator.graph
+        return graph.is_next_action(graph.index[self.last_question.clean_name], question_response, *actions)
 
     def is_end(self):
         return self.is_next_action(SkipState.END)
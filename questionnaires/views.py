@@ -0,0 +1,152 @@
+import datetime
+import json
+from collections import Counter, OrderedDict
+from itertools import islice
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from django.views.generic import TemplateView
+from wagtail.contrib.forms.utils import get_forms_for_user
+from wagtail.contrib.forms.views import SubmissionsListView
+
+from home.mixins import ChunkedExportMixin
+from questionnaires import rollups
+from questionnaires.models import Poll, Quiz, Survey
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class QuestionnaireSubmissionsListView(ChunkedExportMixin, SubmissionsListView):
+    """
+    Export the submissions of a questionnaire in chunks. The rows are built from the
+    values of the submissions instead of UserSubmission.get_data, which looks up the
+    user and the page url of every submission.
+
+    Besides CSV and XLSX, submissions can be exported as JSON Lines with ?export=jsonl.
+    """
+    FORMAT_JSONL = 'jsonl'
+    FORMATS = SubmissionsListView.FORMATS + (FORMAT_JSONL,)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.is_export:
+            queryset = queryset.select_related('user', 'page')
+        return queryset
+
+    def iter_row_dicts(self, queryset):
+        page_url = self.form_page.full_url
+        submissions = queryset.values_list('submit_time', 'user__username', 'form_data')
+        for chunk in _chunked(submissions.iterator(chunk_size=self.export_chunk_size), self.export_chunk_size):
+            # Decode the form data of the whole chunk at once
+            chunk_form_data = json.loads('[{}]'.format(','.join(row[2] for row in chunk)))
+            for (submit_time, username, _raw_form_data), form_data in zip(chunk, chunk_form_data):
+                form_data.update({'user': username, 'submit_time': submit_time, 'page_url': page_url})
+                yield OrderedDict((field, form_data.get(field)) for field in self.list_export)
+
+    def stream_jsonl(self, queryset):
+        for row_dict in self.iter_row_dicts(queryset):
+            yield json.dumps(row_dict, cls=DjangoJSONEncoder) + '\n'
+
+    def write_jsonl_response(self, queryset):
+        response = StreamingHttpResponse(self.stream_jsonl(queryset), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="{self.get_filename()}.jsonl"'
+        return response
+
+    def as_spreadsheet(self, queryset, spreadsheet_format):
+        if spreadsheet_format == self.FORMAT_JSONL:
+            return self.write_jsonl_response(queryset)
+        return super().as_spreadsheet(queryset, spreadsheet_format)
+
+
+class QuestionnaireReportMixin:
+    default_days = 30
+    max_days = 365
+
+    def get_period(self):
+        """
+        :return: the first and last days of the report, set with ?days=
+        """
+        try:
+            days = min(max(int(self.request.GET.get('days', self.default_days)), 1), self.max_days)
+        except ValueError:
+            days = self.default_days
+        end = timezone.localdate()
+        return end - datetime.timedelta(days=days - 1), end
+
+
+class QuestionnaireReportsView(QuestionnaireReportMixin, TemplateView):
+    """
+    The number of submissions of each questionnaire over the period, read from the
+    daily rollups.
+    """
+    template_name = 'questionnaires/reports/index.html'
+
+    def get_context_data(self, **kwargs):
+        start, end = self.get_period()
+        pages = get_forms_for_user(self.request.user).filter(
+            content_type__in=ContentType.objects.get_for_models(Poll, Quiz, Survey).values()
+        ).select_related('content_type').order_by('title')
+        totals = rollups.get_total_submissions([page.pk for page in pages], start, end)
+
+        context = super().get_context_data(**kwargs)
+        context.update({
+            'title': _('Questionnaire responses'),
+            'header_icon': 'form',
+            'start': start,
+            'end': end,
+            'days': (end - start).days + 1,
+            'rows': [(page, totals.get(page.pk, 0)) for page in pages],
+        })
+        return context
+
+
+class QuestionnaireReportView(QuestionnaireReportMixin, TemplateView):
+    """
+    The daily submissions and the answers to each question of a questionnaire over
+    the period, read from the daily rollups. Rendering it takes the same time however
+    many submissions the questionnaire has.
+    """
+    template_name = 'questionnaires/reports/detail.html'
+
+    def get_context_data(self, **kwargs):
+        page = get_object_or_404(get_forms_for_user(self.request.user), pk=self.kwargs['page_id']).specific
+        start, end = self.get_period()
+
+        daily_submissions = rollups.get_daily_submissions(page, start, end)
+        highest = max([count for _, count in daily_submissions] + [1])
+        distribution = rollups.get_answer_distribution(page, start, end)
+        questions = []
+        for field in page.get_form_fields():
+            answers = distribution.get(field.clean_name, Counter())
+            total = sum(answers.values()) or 1
+            questions.append((field.label, [
+                (value, count, round(count * 100 / total, 1)) for value, count in answers.most_common()
+            ]))
+
+        context = super().get_context_data(**kwargs)
+        context.update({
+            'title': _('Questionnaire responses'),
+            'subtitle': page.title,
+            'header_icon': 'form',
+            'page': page,
+            'start': start,
+            'end': end,
+            'days': (end - start).days + 1,
+            'total': sum(count for _, count in daily_submissions),
+            'daily_submissions': [
+                (date, count, round(count * 100 / highest, 1)) for date, count in daily_submissions
+            ],
+            'questions': questions,
+        })
+        return context
@@ -0,0 +1,27 @@
+from django.urls import path, reverse
+from django.utils.translation import gettext_lazy as _
+from wagtail.admin.menu import MenuItem
+from wagtail.contrib.forms.utils import get_forms_for_user
+from wagtail.core import hooks
+
+from questionnaires.views import QuestionnaireReportView, QuestionnaireReportsView
+
+
+@hooks.register('register_admin_urls')
+def register_admin_urls():
+    return [
+        path('reports/questionnaires/', QuestionnaireReportsView.as_view(), name='questionnaire_reports'),
+        path('reports/questionnaires/<int:page_id>/', QuestionnaireReportView.as_view(),
+             name='questionnaire_report'),
+    ]
+
+
+class QuestionnaireReportsMenuItem(MenuItem):
+    def is_shown(self, request):
+        return get_forms_for_user(request.user).exists()
+
+
+@hooks.register('register_reports_menu_item')
+def register_questionnaire_reports_menu_item():
+    return QuestionnaireReportsMenuItem(
+        _('Questionnaire responses'), reverse('questionnaire_reports'), icon_name='form', order=1100)
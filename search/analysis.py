@@ -0,0 +1,127 @@
+import unicodedata
+
+MAX_TOKEN_LENGTH = 50
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_LENGTH = 15
+
+STOP_WORDS = {
+    'en': (
+        'a an and are as at be but by for from has have he her his i if in into is it its of on or our she so '
+        'than that the their them then there these they this to was we were what when which who will with you '
+        'your'
+    ),
+    'es': (
+        'a al con de del el en es esta este la las lo los no o para pero por que se su sus un una y'
+    ),
+    'fr': (
+        'a au aux avec ce ces dans de des du elle en est et il ils je la le les leur mais ne nous on ou par pas '
+        'pour qu que qui sa se ses son sur un une vous'
+    ),
+    'pt': (
+        'a ao as com da das de do dos e em era na nas no nos o os ou para pela pelo por que se sua um uma'
+    ),
+    'ru': (
+        'а в во да для до его если же за и из или к как ли на не но о об от по с со та так то у что это'
+    ),
+    'ar': (
+        'في من على الى إلى عن مع هذا هذه ذلك التي الذي هو هي او أو ثم ما لا كان قد'
+    ),
+    'sw': (
+        'na ya wa kwa ni za la katika au lakini kama hii hiyo cha vya'
+    ),
+    'ur': (
+        'کے کی کا میں ہے اور سے کو نے پر یہ وہ ہیں تھا بھی'
+    ),
+}
+# The other languages of the site, e.g. Khmer or Zulu, have no stop word list:
+# their analyzer keeps every word.
+
+# Spelling variants of the Arabic script used by Arabic, Kurdish and Urdu content.
+# Harakat and tatweel are dropped.
+ARABIC_SCRIPT_TRANSLATION = str.maketrans({
+    **{chr(code): None for code in range(0x064B, 0x0660)},
+    '\u0670': None,
+    '\u0640': None,
+    'آ': 'ا',
+    'أ': 'ا',
+    'إ': 'ا',
+    'ٱ': 'ا',
+    'ى': 'ي',
+    'ی': 'ي',
+    'ک': 'ك',
+    'ة': 'ه',
+})
+
+
+def _is_khmer(char):
+    return '\u1780' <= char <= '\u17ff'
+
+
+class Analyzer:
+    """
+    Splits text into lowercase tokens without Latin, Greek and Cyrillic diacritics
+    or Arabic spelling variants. Khmer isn't written with spaces between words, so
+    Khmer text is split into character bigrams.
+
+    Only the stop words depend on the language of the analyzer, so the tokens of
+    content in one language can be searched with queries in any other language.
+    """
+
+    def __init__(self, stop_words=''):
+        self.stop_words = frozenset(self.normalise(word) for word in stop_words.split())
+
+    def normalise(self, text):
+        chars = []
+        base = ''
+        for char in unicodedata.normalize('NFKD', text.casefold()):
+            if unicodedata.category(char) != 'Mn':
+                base = char
+            elif base < '\u0530':
+                continue
+            chars.append(char)
+        return unicodedata.normalize('NFC', ''.join(chars)).translate(ARABIC_SCRIPT_TRANSLATION)
+
+    def split(self, text):
+        word = []
+        for char in self.normalise(text):
+            if unicodedata.category(char)[0] in 'LMN':
+                word.append(char)
+            elif word:
+                yield ''.join(word)
+                word = []
+        if word:
+            yield ''.join(word)
+
+    def tokenize(self, text, remove_stop_words=True):
+        tokens = []
+        for word in self.split(text):
+            if remove_stop_words and word in self.stop_words:
+                continue
+            if len(word) > 2 and _is_khmer(word[0]):
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+            else:
+                tokens.append(word[:MAX_TOKEN_LENGTH])
+        return tokens
+
+
+ANALYZERS = {language_code: Analyzer(stop_words) for language_code, stop_words in STOP_WORDS.items()}
+DEFAULT_ANALYZER = Analyzer()
+
+
+def get_analyzer(language_code):
+    """
+    :return: the analyzer of the language, without stop words for the languages
+    which have no list in STOP_WORDS
+    """
+    if not language_code:
+        return DEFAULT_ANALYZER
+    return ANALYZERS.get(language_code.split('-')[0].lower(), DEFAULT_ANALYZER)
+
+
+def get_prefixes(token):
+    """
+    :return: the prefixes partial matches of the token are searched with
+    """
+    if _is_khmer(token[0]):
+        return []
+    return [token[:length] for length in range(MIN_PREFIX_LENGTH, min(len(token), MAX_PREFIX_LENGTH) + 1)]
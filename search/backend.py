@@ -0,0 +1,360 @@
+import math
+from collections import Counter, defaultdict
+from warnings import warn
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, models, transaction
+from django.db.models import Avg, Case, Count, Exists, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.manager import Manager
+from django.utils.encoding import force_str
+from django.utils import translation
+from wagtail.core.models import Locale
+from wagtail.search.backends.base import BaseSearchBackend, BaseSearchQueryCompiler, BaseSearchResults
+from wagtail.search.index import AutocompleteField, RelatedFields, SearchField
+from wagtail.search.query import And, Boost, MatchAll, Not, Or, Phrase, PlainText
+from wagtail.search.utils import AND, OR
+
+from search.analysis import MAX_PREFIX_LENGTH, MIN_PREFIX_LENGTH, get_analyzer, get_prefixes
+from search.models import IndexEntry, IndexPosting
+
+MATCH_ALL = '_ALL_'
+MATCH_NONE = '_NONE_'
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def get_descendant_content_type_ids(model):
+    descendant_models = {other_model for other_model in apps.get_models() if issubclass(other_model, model)}
+    return [content_type.pk for content_type in ContentType.objects.get_for_models(*descendant_models).values()]
+
+
+class ObjectIndexer:
+    """
+    Extracts the tokens of an object, weighted by the boost of their search fields.
+    """
+
+    def __init__(self, obj, language_codes):
+        self.obj = obj
+        self.content_type = ContentType.objects.get_for_model(obj)
+        self.id = force_str(obj.pk)
+        self.analyzer = get_analyzer(language_codes.get(getattr(obj, 'locale_id', None), settings.LANGUAGE_CODE))
+
+    def prepare_value(self, value):
+        if isinstance(value, str):
+            return value
+        elif isinstance(value, list):
+            return ', '.join(self.prepare_value(item) for item in value)
+        elif isinstance(value, dict):
+            return ', '.join(self.prepare_value(item) for item in value.values())
+        return force_str(value)
+
+    def prepare_field(self, obj, field):
+        """
+        :return: (value, boost, whether prefixes are indexed, whether only prefixes are indexed)
+        """
+        if isinstance(field, SearchField):
+            yield self.prepare_value(field.get_value(obj)), field.boost or 1, field.partial_match, False
+
+        elif isinstance(field, AutocompleteField):
+            yield self.prepare_value(field.get_value(obj)), 1, True, True
+
+        elif isinstance(field, RelatedFields):
+            sub_obj = field.get_value(obj)
+            if sub_obj is None:
+                return
+
+            if isinstance(sub_obj, Manager):
+                sub_objs = sub_obj.all()
+            else:
+                if callable(sub_obj):
+                    sub_obj = sub_obj()
+                sub_objs = [sub_obj]
+
+            for sub_obj in sub_objs:
+                for sub_field in field.fields:
+                    yield from self.prepare_field(sub_obj, sub_field)
+
+    def get_weights(self):
+        """
+        :return: the weight of each (token, is_prefix) and the number of tokens of the object
+        """
+        weights = Counter()
+        length = 0
+        for field in self.obj.get_search_fields():
+            for value, boost, partial_match, prefixes_only in self.prepare_field(self.obj, field):
+                tokens = self.analyzer.tokenize(value)
+                if not prefixes_only:
+                    length += len(tokens)
+                for token in tokens:
+                    if not prefixes_only:
+                        weights[(token, False)] += boost
+                    if partial_match:
+                        for prefix in get_prefixes(token):
+                            weights[(prefix, True)] += boost
+        return weights, length
+
+
+class Index:
+    name = 'inverted_index'
+    is_installed = False
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @classmethod
+    def check_installed(cls):
+        """
+        Data migrations running before the migrations of the search app save pages
+        before the index tables exist. These pages are indexed by update_index.
+        """
+        if not cls.is_installed:
+            cls.is_installed = IndexEntry._meta.db_table in connection.introspection.table_names()
+        return cls.is_installed
+
+    def add_model(self, model):
+        pass
+
+    def refresh(self):
+        pass
+
+    def reset(self):
+        IndexEntry.objects.all().delete()
+
+    def add_item(self, obj):
+        self.add_items(type(obj), [obj])
+
+    def add_items(self, model, objs):
+        if not self.check_installed():
+            return
+
+        language_codes = dict(Locale.objects.values_list('pk', 'language_code'))
+        indexers = [ObjectIndexer(obj, language_codes) for obj in objs]
+        weights = {(indexer.content_type.pk, indexer.id): indexer.get_weights() for indexer in indexers}
+
+        object_ids = defaultdict(list)
+        for content_type_id, object_id in weights:
+            object_ids[content_type_id].append(object_id)
+
+        with transaction.atomic():
+            for content_type_id, ids in object_ids.items():
+                IndexEntry.objects.filter(content_type_id=content_type_id, object_id__in=ids).delete()
+            IndexEntry.objects.bulk_create([
+                IndexEntry(content_type_id=content_type_id, object_id=object_id, length=length)
+                for (content_type_id, object_id), (_, length) in weights.items()
+            ])
+
+            entries = IndexEntry.objects.none()
+            for content_type_id, ids in object_ids.items():
+                entries |= IndexEntry.objects.filter(content_type_id=content_type_id, object_id__in=ids)
+            IndexPosting.objects.bulk_create([
+                IndexPosting(entry_id=entry_id, token=token, is_prefix=is_prefix, weight=weight)
+                for entry_id, content_type_id, object_id in entries.values_list('pk', 'content_type_id', 'object_id')
+                for (token, is_prefix), weight in weights[(content_type_id, object_id)][0].items()
+            ], batch_size=1000)
+
+    def delete_item(self, obj):
+        if not self.check_installed():
+            return
+
+        IndexEntry.objects.filter(
+            content_type=ContentType.objects.get_for_model(obj), object_id=force_str(obj.pk)).delete()
+
+
+class IndexRebuilder:
+    def __init__(self, index):
+        self.index = index
+
+    def start(self):
+        self.index.reset()
+        return self.index
+
+    def finish(self):
+        pass
+
+
+class InvertedIndexSearchQueryCompiler(BaseSearchQueryCompiler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.fields:
+            warn('The inverted index search backend searches all the search fields of a model.')
+
+        self.analyzer = get_analyzer(translation.get_language())
+        self.content_type_ids = get_descendant_content_type_ids(self.queryset.model)
+        # The tokens the matching entries are ranked by
+        self.tokens = set()
+
+    def _process_lookup(self, field, lookup, value):
+        return Q(**{field.get_attname(self.queryset.model) + '__' + lookup: value})
+
+    def _connect_filters(self, filters, connector, negated):
+        q = AND(filters, Q()) if connector == 'AND' else OR(filters, Q())
+        return ~q if negated else q
+
+    def tokenize(self, text):
+        return self.analyzer.tokenize(text) or self.analyzer.tokenize(text, remove_stop_words=False)
+
+    def get_postings(self, tokens):
+        postings = IndexPosting.objects.filter(token__in=tokens)
+        if not self.partial_match:
+            postings = postings.filter(is_prefix=False)
+        return postings
+
+    def build_token_filter(self, token, rank=True):
+        matches = Q(token=token, is_prefix=False)
+        if self.partial_match and len(token) >= MIN_PREFIX_LENGTH:
+            matches |= Q(token=token[:MAX_PREFIX_LENGTH], is_prefix=True)
+        if rank:
+            self.tokens.update({token, token[:MAX_PREFIX_LENGTH]})
+        return Q(Exists(IndexPosting.objects.filter(matches, entry=OuterRef('pk'))))
+
+    def build_filter(self, query, rank=True):
+        if isinstance(query, PlainText):
+            tokens = self.tokenize(query.query_string)
+            if not tokens:
+                return MATCH_NONE
+            operator = AND if query.operator == 'and' else OR
+            return operator([self.build_token_filter(token, rank) for token in tokens])
+
+        if isinstance(query, Phrase):
+            # Positions are not indexed, phrases match the entries with all their tokens
+            tokens = self.tokenize(query.query_string)
+            if not tokens:
+                return MATCH_NONE
+            return AND([self.build_token_filter(token, rank) for token in tokens])
+
+        if isinstance(query, Boost):
+            return self.build_filter(query.subquery, rank)
+
+        if isinstance(query, MatchAll):
+            return MATCH_ALL
+
+        if isinstance(query, Not):
+            q = self.build_filter(query.subquery, rank=False)
+            if q == MATCH_ALL:
+                return MATCH_NONE
+            elif q == MATCH_NONE:
+                return MATCH_ALL
+            return ~q
+
+        if isinstance(query, And):
+            subqueries = [self.build_filter(subquery, rank) for subquery in query.subqueries]
+            if MATCH_NONE in subqueries:
+                return MATCH_NONE
+            subqueries = [q for q in subqueries if q != MATCH_ALL]
+            return AND(subqueries) if subqueries else MATCH_ALL
+
+        if isinstance(query, Or):
+            subqueries = [self.build_filter(subquery, rank) for subquery in query.subqueries]
+            if MATCH_ALL in subqueries:
+                return MATCH_ALL
+            subqueries = [q for q in subqueries if q != MATCH_NONE]
+            return OR(subqueries) if subqueries else MATCH_NONE
+
+        raise NotImplementedError(
+            '`%s` is not supported by the inverted index search backend.' % query.__class__.__name__)
+
+    def get_entries(self):
+        """
+        :return: the index entries of the objects of the queryset matching the query
+        """
+        q = self.build_filter(self.query)
+        if q == MATCH_NONE:
+            return IndexEntry.objects.none()
+
+        object_ids = (self.queryset.order_by()
+                      .annotate(_object_id=Cast('pk', output_field=models.CharField()))
+                      .values('_object_id'))
+        entries = IndexEntry.objects.filter(content_type_id__in=self.content_type_ids, object_id__in=object_ids)
+        return entries if q == MATCH_ALL else entries.filter(q)
+
+    def get_score(self):
+        """
+        :return: the BM25 rank of an entry for the tokens of the query
+        """
+        if not self.tokens:
+            return Value(0.0, output_field=models.FloatField())
+
+        entries = IndexEntry.objects.filter(content_type_id__in=self.content_type_ids)
+        stats = entries.aggregate(count=Count('pk'), avg_length=Avg('length'))
+        document_frequencies = dict(
+            self.get_postings(self.tokens).filter(entry__in=entries)
+            .values('token').annotate(count=Count('entry', distinct=True)).values_list('token', 'count'))
+
+        idf = Case(*[
+            When(token=token, then=Value(math.log(1 + (stats['count'] - count + 0.5) / (count + 0.5))))
+            for token, count in document_frequencies.items()
+        ], default=Value(0.0), output_field=models.FloatField())
+        length_norm = 1 - B + B * Cast(OuterRef('length'), models.FloatField()) / (stats['avg_length'] or 1)
+        score = (self.get_postings(self.tokens).filter(entry=OuterRef('pk'))
+                 .values('entry')
+                 .annotate(score=Sum(idf * F('weight') * (K1 + 1) / (F('weight') + K1 * length_norm)))
+                 .values('score'))
+        return Coalesce(Subquery(score, output_field=models.FloatField()), Value(0.0))
+
+
+class InvertedIndexSearchResults(BaseSearchResults):
+    def _get_queryset(self):
+        queryset = self.query_compiler.queryset
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset
+
+    def _do_search(self):
+        queryset = self._get_queryset()
+        entries = self.query_compiler.get_entries()
+
+        if not self.query_compiler.order_by_relevance:
+            return queryset.filter(
+                Exists(entries.filter(object_id=Cast(OuterRef('pk'), output_field=models.CharField())))
+            )[self.start:self.stop]
+
+        scores = list(entries.annotate(score=self.query_compiler.get_score())
+                      .order_by('-score', 'pk')
+                      .values_list('object_id', 'score')[self.start:self.stop])
+        pk_field = queryset.model._meta.pk
+        objects = {force_str(obj.pk): obj
+                   for obj in queryset.filter(pk__in=[pk_field.to_python(object_id) for object_id, _ in scores])}
+
+        results = []
+        for object_id, score in scores:
+            obj = objects.get(object_id)
+            if obj is None:
+                continue
+            if self._score_field:
+                setattr(obj, self._score_field, score)
+            results.append(obj)
+        return results
+
+    def _do_count(self):
+        return self.query_compiler.get_entries().count()
+
+
+class InvertedIndexSearchBackend(BaseSearchBackend):
+    """
+    Search backend keeping a token to object posting table in the database, so that
+    search works on SQLite and PostgreSQL without an Elasticsearch cluster.
+    Matches are ranked with BM25, partial matches are found through the indexed
+    prefixes of the tokens of the search fields with partial_match.
+    """
+    query_compiler_class = InvertedIndexSearchQueryCompiler
+    autocomplete_query_compiler_class = InvertedIndexSearchQueryCompiler
+    results_class = InvertedIndexSearchResults
+    rebuilder_class = IndexRebuilder
+
+    def __init__(self, params):
+        super().__init__(params)
+        self.index = Index(self)
+
+    def get_index_for_model(self, model):
+        return self.index
+
+    def reset_index(self):
+        self.index.reset()
+
+
+SearchBackend = InvertedIndexSearchBackend
@@ -0,0 +1,54 @@
+from collections import Counter
+
+from django.utils import timezone, translation
+from wagtail.core.models import Locale
+from wagtail.search.models import Query, QueryDailyHits
+from wagtail.search.utils import normalise_query_string
+
+from home.utils.counters import add_to_counter
+from home.utils.write_buffer import WriteBuffer
+from search.models import QueryLocaleDailyHits
+
+
+def _save(events):
+    """
+    :param events: (query string, language code, date) of each hit
+    """
+    events = Counter((normalise_query_string(query_string), language_code, date)
+                     for query_string, language_code, date in events)
+    query_strings = {query_string for query_string, _, _ in events}
+    Query.objects.bulk_create([Query(query_string=query_string) for query_string in query_strings],
+                              ignore_conflicts=True)
+    queries = dict(Query.objects.filter(query_string__in=query_strings).values_list('query_string', 'pk'))
+    locales = dict(Locale.objects.filter(
+        language_code__in={language_code for _, language_code, _ in events}).values_list('language_code', 'pk'))
+
+    daily_hits = Counter()
+    for (query_string, language_code, date), hits in events.items():
+        daily_hits[(query_string, date)] += hits
+        if language_code in locales:
+            add_to_counter(QueryLocaleDailyHits, 'hits', hits, query_id=queries[query_string],
+                           locale_id=locales[language_code], date=date)
+
+    for (query_string, date), hits in daily_hits.items():
+        add_to_counter(QueryDailyHits, 'hits', hits, query_id=queries[query_string], date=date)
+
+
+buffer = WriteBuffer('search_hits_buffer', _save, 'SEARCH_HITS_BUFFER_SIZE', 'SEARCH_HITS_BUFFER_TIMEOUT')
+
+
+def record(query_string):
+    """
+    Buffer the hit in the cache and write the buffered hits to the database once
+    SEARCH_HITS_BUFFER_SIZE hits are buffered or the oldest buffered hit is older
+    than SEARCH_HITS_BUFFER_TIMEOUT seconds.
+    """
+    buffer.record((query_string, translation.get_language(), timezone.now().date()))
+
+
+def flush():
+    """
+    Roll the buffered hits up into the daily hits of each query, in total and per locale.
+    :return: the number of buffered hits
+    """
+    return buffer.flush()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from search import hit_tracking
+
+
+class Command(BaseCommand):
+    """
+    This command rolls the search hits buffered in the cache up into the daily
+    hits of each query. Run it periodically to keep the search statistics current.
+    """
+
+    def handle(self, *args, **options):
+        count = hit_tracking.flush()
+        self.stdout.write(self.style.SUCCESS(f'Successfully flushed {count} search hits'))
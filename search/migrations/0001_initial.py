@@ -0,0 +1,32 @@
+# Generated by Django 3.1.14 on 2026-10-18 04:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('wagtailsearch', '0004_querydailyhits_verbose_name_plural'),
+        ('wagtailcore', '0059_apply_collection_ordering'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryLocaleDailyHits',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hits', models.IntegerField(default=0)),
+                ('locale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.locale')),
+                ('query', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='locale_daily_hits', to='wagtailsearch.query')),
+            ],
+            options={
+                'verbose_name': 'Query Locale Daily Hits',
+                'verbose_name_plural': 'Query Locale Daily Hits',
+                'unique_together': {('query', 'locale', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.1.14 on 2026-10-18 04:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.CharField(max_length=255)),
+                ('length', models.PositiveIntegerField(default=0)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name_plural': 'Index Entries',
+            },
+        ),
+        migrations.CreateModel(
+            name='IndexPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50)),
+                ('is_prefix', models.BooleanField(default=False)),
+                ('weight', models.FloatField()),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='search.indexentry')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='indexposting',
+            index=models.Index(fields=['token', 'is_prefix'], name='search_inde_token_56e5c5_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='indexposting',
+            unique_together={('entry', 'token', 'is_prefix')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='indexentry',
+            unique_together={('content_type', 'object_id')},
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from wagtail.core.models import Locale
+from wagtail.search.models import Query
+
+from search.analysis import MAX_TOKEN_LENGTH
+
+
+class QueryLocaleDailyHits(models.Model):
+    """
+    Search hits per query, locale and day, rolled up from the buffered hits
+    together with wagtailsearch's QueryDailyHits, see search.hit_tracking.
+    """
+    query = models.ForeignKey(Query, related_name='locale_daily_hits', on_delete=models.CASCADE)
+    locale = models.ForeignKey(Locale, related_name='+', on_delete=models.CASCADE)
+    date = models.DateField()
+    hits = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('query', 'locale', 'date')
+        verbose_name = _('Query Locale Daily Hits')
+        verbose_name_plural = _('Query Locale Daily Hits')
+
+    def __str__(self):
+        return f'{self.query} ({self.locale}, {self.date}): {self.hits}'
+
+    @classmethod
+    def get_top_queries(cls, locale, date_since=None, limit=10):
+        """
+        :return: the most searched queries in the locale with their number of hits
+        """
+        hits = cls.objects.filter(locale=locale)
+        if date_since:
+            hits = hits.filter(date__gte=date_since)
+        return (Query.objects.filter(locale_daily_hits__in=hits)
+                .annotate(_hits=models.Sum('locale_daily_hits__hits'))
+                .order_by('-_hits')[:limit])
+
+
+class IndexEntry(models.Model):
+    """
+    An object in the search index of search.backend.
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    # Not an IntegerField, primary keys are not always integers
+    object_id = models.CharField(max_length=255)
+    # Number of tokens, the documents BM25 ranks are normalised with
+    length = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('content_type', 'object_id')
+        verbose_name_plural = _('Index Entries')
+
+
+class IndexPosting(models.Model):
+    """
+    A token of an indexed object, or a prefix of its tokens for partial matches.
+    """
+    entry = models.ForeignKey(IndexEntry, related_name='postings', on_delete=models.CASCADE)
+    token = models.CharField(max_length=MAX_TOKEN_LENGTH)
+    is_prefix = models.BooleanField(default=False)
+    # Number of occurrences of the token, weighted by the boost of the search fields
+    weight = models.FloatField()
+
+    class Meta:
+        unique_together = ('entry', 'token', 'is_prefix')
+        indexes = [models.Index(fields=['token', 'is_prefix'])]
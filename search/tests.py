@@ -0,0 +1,134 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from wagtail.core.rich_text import RichText
+from wagtail.search.models import Query
+
+from home.factories import ArticleFactory, SectionFactory
+from home.models import Article, FooterIndexPage, FooterPage, HomePage
+from search import hit_tracking
+from search.analysis import get_analyzer
+from search.models import IndexEntry, QueryLocaleDailyHits
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.home_page = HomePage.objects.first()
+        self.section = SectionFactory.build(title='Health section')
+        self.home_page.add_child(instance=self.section)
+        self.article = ArticleFactory.build(title='Health article')
+        self.section.add_child(instance=self.article)
+        self.other_article = ArticleFactory.build(title='Other article')
+        self.section.add_child(instance=self.other_article)
+
+    def test_results_are_grouped_by_type(self):
+        response = self.client.get(reverse('search'), {'query': 'health'})
+
+        search_groups = response.context['search_groups']
+        self.assertEqual(list(search_groups), ['article', 'section'])
+        self.assertEqual(search_groups['article']['search_results_count'], 1)
+        self.assertEqual(list(search_groups['article']['search_results']), [self.article])
+        self.assertEqual(list(search_groups['section']['search_results']), [self.section])
+
+    def test_one_hit_is_recorded_per_search(self):
+        self.client.get(reverse('search'), {'query': 'health'})
+
+        self.assertEqual(Query.get('health').hits, 1)
+
+    def test_subclasses_are_grouped_with_their_group(self):
+        footer_index = FooterIndexPage(title='Footers')
+        self.home_page.add_child(instance=footer_index)
+        footer = FooterPage(title='Health footer')
+        footer_index.add_child(instance=footer)
+
+        response = self.client.get(reverse('search'), {'query': 'health'})
+
+        self.assertEqual(
+            [page.pk for page in response.context['search_groups']['article']['search_results']],
+            [self.article.pk, footer.pk])
+
+    @override_settings(SEARCH_RESULTS_CACHE_TIMEOUT=60)
+    def test_results_are_cached_per_query(self):
+        self.client.get(reverse('search'), {'query': 'health'})
+        self.article.unpublish()
+
+        with mock.patch('search.views.get_grouped_result_ids') as get_grouped_result_ids:
+            response = self.client.get(reverse('search'), {'query': 'health', 'page': '2'})
+            response = self.client.get(reverse('search'), {'query': 'health', 'page': 'x' * 300})
+        get_grouped_result_ids.assert_not_called()
+        self.assertEqual(response.context['search_groups']['article']['search_results_count'], 1)
+
+
+@override_settings(SEARCH_HITS_BUFFER_SIZE=10)
+class SearchHitsBufferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('home.utils.write_buffer.is_shared_cache', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hits_are_rolled_up_on_flush(self):
+        for query_string in ('health', 'Health', 'safety'):
+            hit_tracking.record(query_string)
+
+        self.assertFalse(Query.objects.exists())
+
+        self.assertEqual(hit_tracking.flush(), 3)
+        self.assertEqual(Query.get('health').hits, 2)
+        self.assertEqual(Query.get('safety').hits, 1)
+        self.assertEqual(
+            list(QueryLocaleDailyHits.objects.filter(locale__language_code='en').values_list(
+                'query__query_string', 'hits').order_by('query__query_string')),
+            [('health', 2), ('safety', 1)])
+
+
+@override_settings(WAGTAILSEARCH_BACKENDS={'default': {'BACKEND': 'search.backend'}})
+class InvertedIndexSearchBackendTests(TestCase):
+    def setUp(self):
+        self.home_page = HomePage.objects.first()
+        self.section = SectionFactory.build(title='Nutrition')
+        self.home_page.add_child(instance=self.section)
+        self.article = ArticleFactory.build(title='Healthy eating', body=[
+            ('heading', 'Vegetables'), ('paragraph', RichText('<p>Eat vegetables every day.</p>'))])
+        self.section.add_child(instance=self.article)
+        self.other_article = ArticleFactory.build(title='Café de la santé')
+        self.section.add_child(instance=self.other_article)
+
+    def test_search_fields_are_indexed(self):
+        self.assertEqual(list(Article.objects.live().search('vegetables')), [self.article])
+
+    def test_partial_match(self):
+        self.assertEqual(list(Article.objects.live().search('health')), [self.article])
+        self.assertEqual(list(Article.objects.live().search('health', partial_match=False)), [])
+
+    def test_diacritics_are_ignored(self):
+        self.assertEqual(list(Article.objects.live().search('cafe sante', operator='and')), [self.other_article])
+
+    def test_results_are_ranked(self):
+        more_relevant_article = ArticleFactory.build(title='Vegetables', body=[
+            ('heading', 'Vegetables'), ('paragraph', RichText('<p>Vegetables vegetables.</p>'))])
+        self.section.add_child(instance=more_relevant_article)
+
+        self.assertEqual(list(Article.objects.live().search('vegetables')), [more_relevant_article, self.article])
+
+    def test_index_is_updated_on_publish(self):
+        self.article.title = 'Fruit'
+        self.article.save_revision().publish()
+
+        self.assertEqual(list(Article.objects.live().search('fruit')), [self.article])
+        self.assertEqual(list(Article.objects.live().search('healthy')), [])
+
+    def test_deleted_pages_are_removed_from_the_index(self):
+        self.article.delete()
+
+        self.assertFalse(IndexEntry.objects.filter(object_id=str(self.article.pk)).exists())
+
+    def test_languages_without_stop_words_keep_every_word(self):
+        self.assertEqual(get_analyzer('en').tokenize('the health of children'), ['health', 'children'])
+        self.assertEqual(get_analyzer('zu').tokenize('the health of children'),
+                         ['the', 'health', 'of', 'children'])
+        # Stop words are matched after normalisation, e.g. of the alef with hamza
+        self.assertEqual(get_analyzer('ar').tokenize('الصحة أو التغذية'), ['الصحه', 'التغذيه'])
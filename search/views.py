@@ -1,44 +1,94 @@
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+import hashlib
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.paginator import Page as PaginatorPage, Paginator
 from django.template.response import TemplateResponse
+from django.utils import translation
 from home.models import Article, Section
 from iogt.settings.base import SEARCH_RESULTS_PER_PAGE
-from wagtail.search.models import Query
-from django.core.exceptions import FieldDoesNotExist
+from wagtail.core.models import Page
 from questionnaires.models import Poll, Quiz, Survey
+from search import hit_tracking
 
+SEARCH_GROUPS = (Article, Poll, Quiz, Section, Survey)
 
-def search(request):
-    search_groups = (Article, Poll, Quiz, Section, Survey)
 
+def get_results_cache_key(search_query):
+    return 'search_results:{locale}:{query}'.format(
+        locale=translation.get_language(),
+        query=hashlib.md5(search_query.encode('utf-8')).hexdigest(),
+    )
+
+
+def get_groups_by_content_type():
+    """
+    :return: the search group of each content type, subclasses of a group such as
+    FooterPage being part of it
+    """
+    models = [model for model in apps.get_models() if issubclass(model, SEARCH_GROUPS)]
+    content_types = ContentType.objects.get_for_models(*models)
+    return {
+        content_types[model].pk: next(group for group in SEARCH_GROUPS if issubclass(model, group))
+        for model in models
+    }
+
+
+def get_grouped_result_ids(search_query):
+    """
+    Run a single backend search across all the search groups, for at most
+    SEARCH_RESULTS_LIMIT results, and partition the matching page ids by type,
+    keeping the order of the backend.
+
+    :return: a list of (group, ids)
+    """
+    groups_by_content_type = get_groups_by_content_type()
+    results = Page.objects.live().filter(content_type__in=groups_by_content_type).search(search_query)
+
+    ids_by_group = {group: [] for group in SEARCH_GROUPS}
+    for result in results[:getattr(settings, 'SEARCH_RESULTS_LIMIT', 1000)]:
+        ids_by_group[groups_by_content_type[result.content_type_id]].append(result.pk)
+    return [(group, ids) for group, ids in ids_by_group.items() if ids]
+
+
+def get_cached_grouped_result_ids(search_query):
+    cache_key = get_results_cache_key(search_query)
+    grouped_result_ids = cache.get(cache_key)
+    if grouped_result_ids is None:
+        grouped_result_ids = get_grouped_result_ids(search_query)
+        cache.set(cache_key, grouped_result_ids, getattr(settings, 'SEARCH_RESULTS_CACHE_TIMEOUT', 60))
+    return grouped_result_ids
+
+
+def search(request):
     search_query = request.GET.get("query")
-    page = int(request.GET.get("page", 1))
+    try:
+        page = int(request.GET.get("page", 1))
+    except ValueError:
+        page = 1
 
     results = {"search_query": search_query, "search_groups": {}}
 
-    # Search
-    for search_group in search_groups:
-        search_results_count = 0
-        if search_query:
-            search_results = search_group.objects.live().search(search_query)
-            search_results_count = search_results.count()
-            query = Query.get(search_query)
-
-            # Record hit
-            query.add_hit()
-        else:
-            search_results = search_group.objects.none()
-
-        # Pagination
-        paginator = Paginator(search_results, SEARCH_RESULTS_PER_PAGE)
-        try:
-            search_results = paginator.page(page)
-        except EmptyPage:
-            search_results = paginator.page(paginator.num_pages)
-
-        if search_results:
-            results["search_groups"][search_group._meta.verbose_name] = {
-                "search_results": search_results,
-                "search_results_count": search_results_count,
-            }
+    if not search_query:
+        return TemplateResponse(request, "search/search.html", results)
+
+    # Record hit
+    hit_tracking.record(search_query)
+
+    # Pagination
+    paginator_pages = [(group, Paginator(ids, SEARCH_RESULTS_PER_PAGE).get_page(page))
+                       for group, ids in get_cached_grouped_result_ids(search_query)]
+    pages = Page.objects.filter(
+        pk__in=[pk for _, paginator_page in paginator_pages for pk in paginator_page]).specific().in_bulk()
+
+    for group, paginator_page in paginator_pages:
+        search_results = PaginatorPage(
+            [pages[pk] for pk in paginator_page if pk in pages], paginator_page.number, paginator_page.paginator)
+        results["search_groups"][group._meta.verbose_name] = {
+            "search_results": search_results,
+            "search_results_count": paginator_page.paginator.count,
+        }
 
     return TemplateResponse(request, "search/search.html", results)
@@ -0,0 +1,24 @@
+from wagtail.contrib.modeladmin.options import ModelAdmin, modeladmin_register
+
+from search.models import QueryLocaleDailyHits
+
+
+class QueryLocaleDailyHitsAdmin(ModelAdmin):
+    model = QueryLocaleDailyHits
+    menu_label = 'Search Queries'
+    menu_icon = 'search'
+    list_display = ('query', 'locale', 'date', 'hits')
+    list_filter = ('locale', 'date')
+    search_fields = ('query__query_string',)
+    list_export = ('query', 'locale', 'date', 'hits')
+    inspect_view_enabled = True
+    add_to_settings_menu = True
+    ordering = ('-date', '-hits')
+    list_per_page = 50
+    menu_order = 603
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('query', 'locale')
+
+
+modeladmin_register(QueryLocaleDailyHitsAdmin)